@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from collections import deque
+
+import requests
+from django.conf import settings
+
+from catapi import http_client
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FACT = "Cats are wonderful pets"
+UNREACHABLE_FACT = "cats are greats but api is unreachable"
+INVALID_JSON_FACT = "cats are still great but api didnt return a valid json"
+
+
+class CatFactCache:
+    """
+    Recent cat facts, served from memory with stale-while-revalidate.
+
+    ``get()`` never waits on the upstream once a fact is cached: a fact older
+    than ``ttl`` is still served while one background thread fetches a new
+    one. Only a cold (or hopelessly stale) cache waits, and then for at most
+    ``cold_wait`` seconds, on that same single in-flight fetch.
+    """
+
+    def __init__(self, url, timeout, ttl=None, max_stale=None, size=None, cold_wait=None):
+        self.url = url
+        self.timeout = timeout
+        self.ttl = settings.CAT_FACT_TTL if ttl is None else ttl
+        self.max_stale = settings.CAT_FACT_MAX_STALE if max_stale is None else max_stale
+        self.cold_wait = timeout if cold_wait is None else cold_wait
+        self.facts = deque(maxlen=size or settings.CAT_FACT_CACHE_SIZE)
+        self.fetched_at = None
+        self.last_error = UNREACHABLE_FACT
+        self._lock = threading.Lock()
+        self._refreshed = threading.Event()
+        self._refreshing = False
+        self._async_refreshes = weakref.WeakKeyDictionary()
+
+    def _store(self, fact):
+        with self._lock:
+            self.facts.append(fact)
+            self.fetched_at = time.monotonic()
+        return fact
+
+    def _failed(self, fallback):
+        self.last_error = fallback
+        return fallback
+
+    def fetch(self):
+        """Fetch one fact from the upstream and remember it; returns it or the fallback text."""
+        try:
+            response = http_client.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            fact = response.json().get("fact", DEFAULT_FACT)
+        except requests.exceptions.RequestException as e:
+            logger.error("Cat api failed: %s ", e)
+            return self._failed(UNREACHABLE_FACT)
+        except ValueError:
+            logger.error("api didnt return as a valid json")
+            return self._failed(INVALID_JSON_FACT)
+        return self._store(fact)
+
+    async def afetch(self):
+        """Async :meth:`fetch` over the shared httpx client."""
+        try:
+            response = await http_client.aget(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            fact = response.json().get("fact", DEFAULT_FACT)
+        except http_client.UPSTREAM_ERRORS as e:
+            logger.error("Cat api failed: %s ", e)
+            return self._failed(UNREACHABLE_FACT)
+        except ValueError:
+            logger.error("api didnt return as a valid json")
+            return self._failed(INVALID_JSON_FACT)
+        return self._store(fact)
+
+    def _refresh(self):
+        try:
+            self.fetch()
+        finally:
+            with self._lock:
+                self._refreshing = False
+                self._refreshed.set()
+
+    def refresh_in_background(self):
+        """Start a background fetch unless one is already running; returns the event it sets when done."""
+        with self._lock:
+            if not self._refreshing:
+                self._refreshing = True
+                self._refreshed = threading.Event()
+                threading.Thread(target=self._refresh, name="cat-fact-refresh", daemon=True).start()
+            return self._refreshed
+
+    def _age(self):
+        return None if self.fetched_at is None else time.monotonic() - self.fetched_at
+
+    def _cached(self, age):
+        """A cached fact when one is fresh enough (starting a refresh if it is stale), else None."""
+        if age is not None and age < self.ttl:
+            return random.choice(self.facts)
+        if age is not None and age < self.max_stale:
+            self.refresh_in_background()
+            return random.choice(self.facts)
+        return None
+
+    def _after_cold_wait(self):
+        with self._lock:
+            fresh = self.fetched_at is not None and time.monotonic() - self.fetched_at < self.max_stale
+            return random.choice(self.facts) if fresh else self.last_error
+
+    def get(self):
+        fact = self._cached(self._age())
+        if fact is not None:
+            return fact
+        self.refresh_in_background().wait(self.cold_wait)
+        return self._after_cold_wait()
+
+    async def aget(self):
+        """
+        :meth:`get` for async views: a cold cache awaits one shared fetch on
+        the running event loop instead of blocking a thread.
+        """
+        fact = self._cached(self._age())
+        if fact is not None:
+            return fact
+        loop = asyncio.get_running_loop()
+        refresh = self._async_refreshes.get(loop)
+        if refresh is None or refresh.done():
+            refresh = self._async_refreshes[loop] = loop.create_task(self.afetch())
+        try:
+            await asyncio.wait_for(asyncio.shield(refresh), self.cold_wait)
+        except asyncio.TimeoutError:
+            pass
+        return self._after_cold_wait()
@@ -0,0 +1,159 @@
+import itertools
+import json
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+from catapi.cache import bump_generation
+
+from .models import String, StringCharacter
+from .nlq import STRINGS_CACHE_NAMESPACE
+from .properties import compute_batch
+
+
+logger = logging.getLogger(__name__)
+
+STATUS_CREATED = "created"
+STATUS_CONFLICT = "conflict"
+STATUS_INVALID = "invalid"
+
+
+def parse_ndjson(lines):
+    """Yield one decoded JSON value per non-blank NDJSON line, or a ValueError in its place."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"invalid JSON: {e}")
+
+
+def _item_value(item):
+    if isinstance(item, Exception):
+        return None, str(item)
+    if isinstance(item, dict):
+        item = item.get("value")
+    if not isinstance(item, str):
+        return None, 'Invalid data type for "value" (must be string)'
+    return item, None
+
+
+def _insert_new(strings, batch_size):
+    """
+    Insert ``strings`` and return the ones this call actually wrote.
+
+    One ``bulk_create`` normally. If a concurrent request inserted one of
+    the hashes since they were checked, fall back to inserting row by row,
+    each in its own savepoint, and leave out the rows that lost the race.
+    """
+    try:
+        with transaction.atomic():
+            String.objects.bulk_create(strings, batch_size=batch_size)
+        return strings
+    except IntegrityError:
+        pass
+    inserted = []
+    for string in strings:
+        string.pk = None
+        try:
+            with transaction.atomic():
+                string.save(force_insert=True)
+        except IntegrityError:
+            continue
+        inserted.append(string)
+    return inserted
+
+
+def ingest_strings(items, chunk_size=None, workers=None):
+    """
+    Analyze and store many strings, ``chunk_size`` items at a time.
+
+    ``items`` may be plain strings or ``{"value": ...}`` objects. Each chunk
+    is deduplicated against itself and against the database with a single
+    ``sha256_hash IN (...)`` query, then inserted with one ``bulk_create``.
+    Properties for a chunk are computed together, across ``workers``
+    processes when configured. Yields a status dict per item, in input
+    order, so callers never hold more than one chunk of strings in memory.
+    """
+    chunk_size = chunk_size or settings.STRING_BATCH_CHUNK_SIZE
+    workers = settings.STRING_PROPERTIES_WORKERS if workers is None else workers
+    items = iter(enumerate(items))
+
+    while True:
+        chunk = list(itertools.islice(items, chunk_size))
+        if not chunk:
+            return
+
+        results = []
+        valid = []
+        for index, item in chunk:
+            value, error = _item_value(item)
+            if error:
+                results.append({"index": index, "status": STATUS_INVALID, "error": error})
+            else:
+                result = {"index": index, "status": STATUS_CREATED}
+                results.append(result)
+                valid.append((result, value))
+
+        pending = {}
+        for (result, value), properties in zip(valid, compute_batch([value for _, value in valid], workers)):
+            result["sha256_hash"] = properties["sha256_hash"]
+            if properties["sha256_hash"] in pending:
+                result["status"] = STATUS_CONFLICT
+                continue
+            pending[properties["sha256_hash"]] = String.from_properties(value, properties)
+
+        with transaction.atomic():
+            existing = set(
+                String.objects.filter(sha256_hash__in=list(pending)).values_list("sha256_hash", flat=True)
+            )
+            new_strings = _insert_new(
+                [string for sha256_hash, string in pending.items() if sha256_hash not in existing], chunk_size
+            )
+
+            # MySQL's bulk_create leaves pk unset, so look the ids up once
+            ids = dict(
+                String.objects.filter(sha256_hash__in=[string.sha256_hash for string in new_strings])
+                .values_list("sha256_hash", "id")
+            )
+            for string in new_strings:
+                string.pk = ids[string.sha256_hash]
+            StringCharacter.index_strings(new_strings)
+
+        if new_strings:
+            bump_generation(STRINGS_CACHE_NAMESPACE)
+
+        # only rows this chunk wrote are "created"; anything else already existed or lost a race
+        for result in results:
+            if result["status"] == STATUS_CREATED:
+                if result["sha256_hash"] in ids:
+                    result["id"] = ids[result["sha256_hash"]]
+                else:
+                    result["status"] = STATUS_CONFLICT
+        logger.info("ingested chunk of %d strings, %d new", len(chunk), len(new_strings))
+        yield from results
+
+
+def encode_results(results):
+    """
+    Encode ingest results one at a time as a JSON object.
+
+    The object is ``{"results": [...], "created": n, "conflicts": n,
+    "invalid": n}``. The counts come last, once every result has gone by, so a response
+    streamed from this holds at most one chunk of results in memory.
+    """
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    counts = {STATUS_CREATED: 0, STATUS_CONFLICT: 0, STATUS_INVALID: 0}
+    yield b'{"results":['
+    separator = ""
+    for result in results:
+        counts[result["status"]] += 1
+        yield (separator + encoder.encode(result)).encode("utf-8")
+        separator = ","
+    yield (
+        f'],"created":{counts[STATUS_CREATED]},"conflicts":{counts[STATUS_CONFLICT]},"invalid":{counts[STATUS_INVALID]}}}'
+    ).encode("utf-8")
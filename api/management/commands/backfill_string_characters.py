@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.models import String, StringCharacter
+from catapi.streaming import iterate_in_batches
+
+
+class Command(BaseCommand):
+    help = "Populate the StringCharacter index for strings created before it existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="strings indexed per bulk insert")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        queryset = String.objects.filter(characters__isnull=True).only("id", "character_frequency_map", "character_frequency_blob")
+
+        batch = []
+        strings_indexed = 0
+        for string in iterate_in_batches(queryset, batch_size):
+            batch.append(string)
+            if len(batch) >= batch_size:
+                StringCharacter.index_strings(batch)
+                strings_indexed += len(batch)
+                batch = []
+        if batch:
+            StringCharacter.index_strings(batch)
+            strings_indexed += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"indexed characters for {strings_indexed} strings"))
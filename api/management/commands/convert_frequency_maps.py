@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.models import String
+from catapi.streaming import iterate_in_batches
+
+
+class Command(BaseCommand):
+    help = "Rewrite stored character frequency maps in the given encoding (default STRING_FREQUENCY_ENCODING)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--encoding", choices=["json", "packed"], default=None)
+        parser.add_argument("--batch-size", type=int, default=1000, help="strings rewritten per bulk update")
+
+    def handle(self, *args, **options):
+        encoding = options["encoding"] or settings.STRING_FREQUENCY_ENCODING
+        batch_size = options["batch_size"]
+        # only rows still stored the other way need rewriting
+        if encoding == "packed":
+            pending = Q(character_frequency_map__isnull=False)
+        else:
+            pending = Q(character_frequency_blob__isnull=False)
+        queryset = String.objects.filter(pending).only("id", "character_frequency_map", "character_frequency_blob")
+
+        batch = []
+        strings_converted = 0
+        for string in iterate_in_batches(queryset, batch_size):
+            string.set_frequency_map(string.frequency_map, encoding)
+            batch.append(string)
+            if len(batch) >= batch_size:
+                String.objects.bulk_update(batch, ["character_frequency_map", "character_frequency_blob"])
+                strings_converted += len(batch)
+                batch = []
+        if batch:
+            String.objects.bulk_update(batch, ["character_frequency_map", "character_frequency_blob"])
+            strings_converted += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"converted {strings_converted} strings to {encoding}"))
@@ -1,6 +1,11 @@
+import hashlib
+
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from .properties import pack_frequency_map, unpack_frequency_map
+
 
 
 # Create your models here.
@@ -12,12 +17,94 @@ class String(models.Model):
     is_palindrome = models.BooleanField()
     unique_characters = models.IntegerField()
     word_count = models.IntegerField()
-    sha256_hash = models.CharField(max_length=1000)
-    character_frequency_map = models.JSONField()
+    # hex SHA-256 of the UTF-8 value; the content address used for dedupe and lookups
+    sha256_hash = models.CharField(max_length=64, unique=True)
+    # exactly one of these is set, chosen by STRING_FREQUENCY_ENCODING; read through frequency_map
+    character_frequency_map = models.JSONField(null=True)
+    character_frequency_blob = models.BinaryField(null=True, editable=False)
     created_at = models.DateTimeField(default=timezone.now, editable=False)
     
+    class Meta:
+        # match the filter combinations served by string_list and natural_lang
+        indexes = [
+            models.Index(fields=["is_palindrome", "length"], name="string_palindrome_length_idx"),
+            models.Index(fields=["word_count", "length"], name="string_word_count_length_idx"),
+            models.Index(fields=["length"], name="string_length_idx"),
+        ]
+    
     
     
     def __str__(self):
         return self.value
-    
\ No newline at end of file
+    
+    @staticmethod
+    def digest(value):
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()
+    
+    @classmethod
+    def from_properties(cls, value, properties):
+        """Build an unsaved String from ``compute_properties`` output."""
+        properties = dict(properties)
+        character_frequency_map = properties.pop("character_frequency_map")
+        string = cls(value=value, **properties)
+        string.set_frequency_map(character_frequency_map)
+        return string
+    
+    def set_frequency_map(self, character_frequency_map, encoding=None):
+        encoding = encoding or settings.STRING_FREQUENCY_ENCODING
+        if encoding == "packed":
+            self.character_frequency_map = None
+            self.character_frequency_blob = pack_frequency_map(character_frequency_map)
+        else:
+            self.character_frequency_map = character_frequency_map
+            self.character_frequency_blob = None
+        self._frequency_map = character_frequency_map
+    
+    @staticmethod
+    def decode_frequency_map(character_frequency_map, character_frequency_blob):
+        if character_frequency_map is not None:
+            return character_frequency_map
+        if character_frequency_blob is not None:
+            return unpack_frequency_map(character_frequency_blob)
+        return {}
+    
+    @property
+    def frequency_map(self):
+        """The character frequency map, unpacked on first access when stored compactly."""
+        if "_frequency_map" not in self.__dict__:
+            self._frequency_map = self.decode_frequency_map(
+                self.character_frequency_map, self.character_frequency_blob
+            )
+        return self._frequency_map
+    
+
+class StringCharacter(models.Model):
+    """
+    One row per distinct lowercased character of a String, so contains-character
+    filters become an indexed lookup instead of a LIKE scan over ``value``.
+
+    Characters are stored as code points to avoid MySQL collations folding
+    accented letters together.
+    """
+    string = models.ForeignKey(String, on_delete=models.CASCADE, related_name="characters")
+    codepoint = models.PositiveIntegerField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["codepoint", "string"], name="string_character_unique"),
+        ]
+    
+    @staticmethod
+    def codepoints(character_frequency_map):
+        return {ord(lowered) for character in character_frequency_map for lowered in character.lower()}
+    
+    @classmethod
+    def index_strings(cls, strings, batch_size=1000):
+        """Create the character rows for ``strings``; rows that already exist are ignored."""
+        rows = [
+            cls(string=string, codepoint=codepoint)
+            for string in strings
+            for codepoint in cls.codepoints(string.frequency_map)
+        ]
+        cls.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+        return len(rows)
@@ -0,0 +1,117 @@
+import re
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+
+from catapi.cache import make_key
+
+
+# bumped on every insert/delete of a String so cached result id lists go stale together
+STRINGS_CACHE_NAMESPACE = "strings"
+
+PARSE_CACHE_SIZE = 1024
+# ids per query when loading rows for a cached id list; keeps IN (...) lists bounded
+ID_CHUNK_SIZE = 1000
+
+SINGLE_WORD = re.compile(r"single[\s-]word")
+PALINDROME = re.compile(r"palindrom(?:e|ic)")
+LONGER_THAN = re.compile(r"longer\s+than\s+(\d+)")
+SHORTER_THAN = re.compile(r"(?:shorter|less)\s+than\s+(\d+)")
+CONTAINS_LETTER = re.compile(r"containing.*letter\s+([a-z])")
+
+
+def filter_contains_character(queryset, character):
+    """
+    Case-insensitive contains-character filter.
+
+    Single characters go through the StringCharacter index; anything longer
+    falls back to a LIKE scan on ``value``.
+    """
+    lowered = character.lower()
+    if len(lowered) != 1:
+        return queryset.filter(value__icontains=character)
+    return queryset.filter(characters__codepoint=ord(lowered))
+
+
+@dataclass(frozen=True)
+class StringFilter:
+    """Normalized filters parsed from a natural-language query; None means unfiltered."""
+    word_count: int | None = None
+    is_palindrome: bool | None = None
+    min_length: int | None = None
+    contains_character: str | None = None
+    max_length: int | None = None
+
+    def as_dict(self):
+        return {name: value for name, value in asdict(self).items() if value is not None}
+
+    def is_empty(self):
+        return not self.as_dict()
+
+    def is_conflicting(self):
+        return self.min_length is not None and self.max_length is not None and self.min_length > self.max_length
+
+    def apply(self, queryset):
+        if self.is_palindrome is not None:
+            queryset = queryset.filter(is_palindrome=self.is_palindrome)
+        if self.word_count is not None:
+            queryset = queryset.filter(word_count=self.word_count)
+        if self.min_length is not None:
+            queryset = queryset.filter(length__gte=self.min_length)
+        if self.max_length is not None:
+            queryset = queryset.filter(length__lte=self.max_length)
+        if self.contains_character is not None:
+            queryset = filter_contains_character(queryset, self.contains_character)
+        return queryset
+
+
+def normalize_query(text):
+    return " ".join(text.lower().split())
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _compile(normalized):
+    filters = {}
+    if SINGLE_WORD.search(normalized):
+        filters["word_count"] = 1
+    if PALINDROME.search(normalized):
+        filters["is_palindrome"] = True
+    match = LONGER_THAN.search(normalized)
+    if match:
+        filters["min_length"] = int(match.group(1)) + 1
+    match = CONTAINS_LETTER.search(normalized)
+    if match:
+        filters["contains_character"] = match.group(1)
+    # with several "shorter/less than N" bounds the last one wins
+    bounds = SHORTER_THAN.findall(normalized)
+    if bounds:
+        filters["max_length"] = int(bounds[-1]) - 1
+    return StringFilter(**filters)
+
+
+def parse_query(text):
+    """Compile ``text`` into a StringFilter, memoized on the normalized text."""
+    return _compile(normalize_query(text))
+
+
+def matching_ids(string_filter, queryset):
+    """
+    Primary keys of the rows in ``queryset`` matching ``string_filter``, in pk order.
+
+    Cached per filter and strings generation, so repeated queries skip the
+    filtered scan until a string is created or deleted.
+    """
+    key = make_key(STRINGS_CACHE_NAMESPACE, "nlq", string_filter)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(string_filter.apply(queryset).order_by("pk").values_list("pk", flat=True))
+        cache.set(key, ids, timeout=settings.NLQ_RESULT_CACHE_TIMEOUT)
+    return ids
+
+
+def rows_for_ids(queryset, ids, columns):
+    """Yield ``.values(*columns)`` rows for ``ids``, in pk order, ``ID_CHUNK_SIZE`` ids per query."""
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        yield from queryset.filter(pk__in=ids[start:start + ID_CHUNK_SIZE]).order_by("pk").values(*columns)
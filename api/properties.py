@@ -0,0 +1,130 @@
+import hashlib
+import os
+import struct
+import threading
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+
+# inputs at least this long take the single-pass large-input path
+LARGE_INPUT_THRESHOLD = 64 * 1024
+# bytes fed to sha256 per update() call; hashlib releases the GIL for each chunk
+HASH_CHUNK_SIZE = 1024 * 1024
+# a batch smaller than this (total characters) is not worth shipping to worker processes
+PARALLEL_MIN_CHARS = 1024 * 1024
+
+# ASCII whitespace as str.split() sees it, mapped to 0; every other byte maps to 1
+_WORD_TABLE = bytes(0 if chr(byte).isspace() else 1 for byte in range(256))
+
+# one (codepoint, count) pair of little-endian uint32s per distinct character
+_FREQUENCY_PAIR = struct.Struct("<II")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _small_properties(value):
+    cleaned_value = value.lower()
+    character_frequency_map = dict(Counter(value))
+    return {
+        "length": len(value),
+        "sha256_hash": hashlib.sha256(value.encode("utf-8")).hexdigest(),
+        "unique_characters": len(character_frequency_map),
+        "is_palindrome": cleaned_value == cleaned_value[::-1],
+        "word_count": len(value.split()),
+        "character_frequency_map": character_frequency_map,
+    }
+
+
+def _sha256_chunked(data):
+    digest = hashlib.sha256()
+    view = memoryview(data)
+    for start in range(0, len(view), HASH_CHUNK_SIZE):
+        digest.update(view[start:start + HASH_CHUNK_SIZE])
+    return digest.hexdigest()
+
+
+def _ascii_word_count(encoded):
+    # 0 for whitespace, 1 otherwise; each word starts at a 0->1 edge or at offset 0
+    marks = encoded.translate(_WORD_TABLE)
+    return marks.count(b"\x00\x01") + (1 if marks[:1] == b"\x01" else 0)
+
+
+def _large_properties(value):
+    encoded = value.encode("utf-8")
+
+    if value.isascii():
+        counts = Counter(encoded)
+        # Counter(value) orders keys by first occurrence; keep that order for identical output
+        order = sorted(counts, key=encoded.index)
+        character_frequency_map = {chr(byte): counts[byte] for byte in order}
+        lowered = encoded.lower()
+        word_count = _ascii_word_count(encoded)
+    else:
+        character_frequency_map = dict(Counter(value))
+        lowered = value.lower()
+        word_count = len(value.split())
+
+    return {
+        "length": len(value),
+        "sha256_hash": _sha256_chunked(encoded),
+        "unique_characters": len(character_frequency_map),
+        "is_palindrome": lowered == lowered[::-1],
+        "word_count": word_count,
+        "character_frequency_map": character_frequency_map,
+    }
+
+
+def compute_properties(value):
+    """
+    Compute the stored properties of ``value``.
+
+    Output is identical to the original per-value implementation. Large
+    inputs take a single-pass path: the UTF-8 encoding is hashed in chunks
+    over a memoryview, unique characters come from the frequency map instead
+    of a separate ``set``, and for ASCII input the palindrome check and word
+    count run on bytes (``bytes.translate``) without building a word list.
+    """
+    if len(value) < LARGE_INPUT_THRESHOLD:
+        return _small_properties(value)
+    return _large_properties(value)
+
+
+def get_pool(workers=None):
+    """Return the shared process pool used for batch property computation."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+    return _pool
+
+
+def compute_batch(values, workers=None):
+    """
+    Compute properties for a list of strings, in input order.
+
+    With ``workers`` > 1 and enough total input, the work is fanned out over
+    a shared process pool so it runs on several cores outside the GIL;
+    otherwise it runs inline.
+    """
+    if not workers or workers <= 1 or sum(map(len, values)) < PARALLEL_MIN_CHARS:
+        return [compute_properties(value) for value in values]
+    chunksize = max(1, len(values) // (workers * 4))
+    return list(get_pool(workers).map(compute_properties, values, chunksize=chunksize))
+
+
+def pack_frequency_map(character_frequency_map):
+    """Encode a frequency map as zlib-compressed (codepoint, count) pairs, keeping key order."""
+    packed = b"".join(
+        _FREQUENCY_PAIR.pack(ord(character), count) for character, count in character_frequency_map.items()
+    )
+    return zlib.compress(packed)
+
+
+def unpack_frequency_map(blob):
+    """Inverse of :func:`pack_frequency_map`."""
+    return {
+        chr(codepoint): count for codepoint, count in _FREQUENCY_PAIR.iter_unpack(zlib.decompress(blob))
+    }
@@ -1,5 +1,6 @@
 from .models import String
 from rest_framework import serializers
+from catapi.fast_serializers import datetime_converter
 
 
 class StringValueField(serializers.Field):
@@ -23,7 +24,11 @@ class ValidateString(serializers.Serializer):
 
 
 
+PROPERTY_FIELDS = ('length', 'is_palindrome', 'unique_characters', 'word_count', 'sha256_hash', 'character_frequency_map')
+
+
 class StringSerializer(serializers.ModelSerializer):
+    # context["property_fields"] limits "properties" to those keys; by default all are returned
     properties = serializers.SerializerMethodField()
     class Meta:
         model = String
@@ -32,13 +37,42 @@ class StringSerializer(serializers.ModelSerializer):
         
         
     def get_properties(self, obj):
+        fields = self.context.get('property_fields') or PROPERTY_FIELDS
         return {
-                            'length': obj.length,
-                            'is_palindrome': obj.is_palindrome,
-                            'unique_characters': obj.unique_characters,
-                            'word_count': obj.word_count,
-                            'sha256_hash': obj.sha256_hash,
-                            'character_frequency_map': obj.character_frequency_map,
-                        }
-        
-                        
\ No newline at end of file
+            field: obj.frequency_map if field == 'character_frequency_map' else getattr(obj, field)
+            for field in fields
+        }
+
+
+def string_row_serializer(property_fields=None):
+    """
+    Read-only fast path producing StringSerializer output from ``.values()`` rows.
+
+    Returns ``(columns, to_dicts)`` like ``compile_row_serializer``; only the
+    columns the requested ``property_fields`` need are selected.
+    """
+    property_fields = property_fields or PROPERTY_FIELDS
+    created_at = datetime_converter(StringSerializer().fields['created_at'])
+    plain_fields = [field for field in property_fields if field != 'character_frequency_map']
+    columns = ['id', 'value', 'created_at', *plain_fields]
+    if 'character_frequency_map' in property_fields:
+        columns += ['character_frequency_map', 'character_frequency_blob']
+
+    def to_dicts(rows):
+        data = []
+        for row in rows:
+            properties = {}
+            for field in property_fields:
+                if field == 'character_frequency_map':
+                    properties[field] = String.decode_frequency_map(row['character_frequency_map'], row['character_frequency_blob'])
+                else:
+                    properties[field] = row[field]
+            data.append({
+                'id': row['id'],
+                'value': row['value'],
+                'properties': properties,
+                'created_at': created_at(row['created_at']),
+            })
+        return data
+
+    return columns, to_dicts
@@ -1,3 +1,552 @@
-from django.test import TestCase
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipIf
 
-# Create your tests here.
+import requests
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from catapi import http_client
+from catapi.renderers import ORJSONRenderer
+
+from . import ingest, properties
+from .facts import UNREACHABLE_FACT, CatFactCache
+from .models import String, StringCharacter
+from .serializer import StringSerializer, string_row_serializer
+from .nlq import StringFilter, parse_query
+from .views import AsyncUserprofile, String_Properties, filter_contains_character
+
+
+def make_string(value, index=True):
+    properties = String_Properties().stringproperities(value)
+    string = String.from_properties(value, properties)
+    string.save()
+    if index:
+        StringCharacter.index_strings([string])
+    return string
+
+
+class StringIndexTests(TestCase):
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    # SQLite gets a bare boolean column in WHERE, which it cannot match to an index
+    @skipIf(connection.vendor == "sqlite", "boolean filters are not index-matched on SQLite")
+    def test_palindrome_filter_uses_index(self):
+        self.assertUsesIndex(String.objects.filter(is_palindrome=True, length__gte=3), "string_palindrome_length_idx")
+
+    def test_list_filters_use_indexes(self):
+        self.assertUsesIndex(String.objects.filter(word_count=1, length__lte=10), "string_word_count_length_idx")
+        self.assertUsesIndex(String.objects.filter(length__gte=3, length__lte=10), "string_length_idx")
+
+
+@override_settings(ROOT_URLCONF="api.urls")
+class StringListPaginationTests(APITestCase):
+    def setUp(self):
+        for value in ["level", "kayak", "hello", "world", "noon", "racecar", "abc"]:
+            make_string(value)
+
+    def test_cursor_pages_cover_filtered_rows(self):
+        url = reverse("list_strings") + "?is_palindrome=true&page_size=2"
+        values = []
+        while url:
+            body = self.client.get(url).json()
+            self.assertLessEqual(body["count"], 2)
+            values.extend(item["value"] for item in body["data"])
+            url = body["next"]
+        self.assertEqual(values, ["level", "kayak", "noon", "racecar"])
+
+    def test_tampered_cursor_is_rejected(self):
+        cursor = base64.urlsafe_b64encode(json.dumps({"v": "x", "pk": "abc"}).encode()).decode().rstrip("=")
+        response = self.client.get(reverse("list_strings") + f"?cursor={cursor}")
+        self.assertEqual(response.status_code, 400)
+
+    def test_unpaginated_opt_in(self):
+        body = self.client.get(reverse("list_strings") + "?paginate=false").json()
+        self.assertEqual(body["count"], 7)
+        self.assertNotIn("next", body)
+
+
+@override_settings(ROOT_URLCONF="api.urls", EXPORT_CHUNK_SIZE=2)
+class StringExportTests(APITestCase):
+    def setUp(self):
+        self.strings = [make_string(value) for value in ["level", "hello", "a b c", "zz"]]
+
+    def test_json_and_ndjson_match_serializer(self):
+        expected = json.loads(json.dumps(StringSerializer(self.strings, many=True).data))
+
+        response = self.client.get(reverse("export_strings"))
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), expected)
+
+        response = self.client.get(reverse("export_strings") + "?output=ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+    def test_unknown_output_format(self):
+        self.assertEqual(self.client.get(reverse("export_strings") + "?output=xml").status_code, 400)
+
+
+@override_settings(ROOT_URLCONF="api.urls")
+class ContainsCharacterIndexTests(APITestCase):
+    def setUp(self):
+        for value in ["Zebra", "apple", "fizz", "Crème"]:
+            make_string(value)
+
+    def test_filters_through_character_index(self):
+        body = self.client.get(reverse("list_strings") + "?contains_character=Z").json()
+        self.assertEqual([item["value"] for item in body["data"]], ["Zebra", "fizz"])
+
+        body = self.client.get(reverse("filter_by_natural_language") + "?query=strings containing the letter z").json()
+        self.assertEqual(body["count"], 2)
+
+        self.assertEqual(filter_contains_character(String.objects.all(), "è").get().value, "Crème")
+
+    def test_lookup_uses_index(self):
+        plan = filter_contains_character(String.objects.all(), "z").explain()
+        # SQLite reports unique constraints under an autoindex name
+        self.assertRegex(plan, r"string_character_unique|sqlite_autoindex_api_stringcharacter")
+
+    def test_backfill_command(self):
+        make_string("quiz", index=False)
+        self.assertEqual(filter_contains_character(String.objects.all(), "q").count(), 0)
+        call_command("backfill_string_characters", stdout=open(os.devnull, "w"))
+        self.assertEqual(filter_contains_character(String.objects.all(), "q").get().value, "quiz")
+
+
+@override_settings(ROOT_URLCONF="api.urls", STRING_BATCH_CHUNK_SIZE=3)
+class StringBatchTests(APITestCase):
+    def post_batch(self, *args, **kwargs):
+        response = self.client.post(reverse("create_string_batch"), *args, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_json_array_reports_per_item_status(self):
+        make_string("existing")
+        payload = ["alpha", {"value": "beta"}, "existing", 42, "alpha", "gamma", "delta"]
+        body = self.post_batch(payload, format="json")
+
+        self.assertEqual(
+            [item["status"] for item in body["results"]],
+            ["created", "created", "conflict", "invalid", "conflict", "created", "created"],
+        )
+        self.assertEqual((body["created"], body["conflicts"], body["invalid"]), (4, 2, 1))
+        self.assertEqual(String.objects.count(), 5)
+        self.assertEqual(filter_contains_character(String.objects.all(), "m").get().value, "gamma")
+
+    def test_ndjson_body(self):
+        body = '"one"\n{"value": "two"}\n\nnot json\n'
+        body = self.post_batch(body, content_type="application/x-ndjson")
+        self.assertEqual([item["status"] for item in body["results"]], ["created", "created", "invalid"])
+        self.assertEqual(
+            body["results"][1]["id"], String.objects.get(value="two").id
+        )
+
+    def test_response_streams_chunk_by_chunk(self):
+        response = self.client.post(reverse("create_string_batch"), ["a", "b", "c", "d", "e"], format="json")
+        chunks = iter(response.streaming_content)
+        head = [next(chunks), next(chunks)]
+        # only the first chunk (STRING_BATCH_CHUNK_SIZE=3) has been stored so far
+        self.assertEqual(String.objects.count(), 3)
+        self.assertEqual(json.loads(b"".join(head + list(chunks)))["created"], 5)
+
+    def test_string_inserted_by_another_request_is_a_conflict(self):
+        insert_new = ingest._insert_new
+
+        def insert_after_rival(strings, batch_size):
+            # another request stores "beta" after this chunk's existence check
+            make_string("beta")
+            return insert_new(strings, batch_size)
+
+        with mock.patch("api.ingest._insert_new", side_effect=insert_after_rival):
+            results = list(ingest.ingest_strings(["alpha", "beta"]))
+        self.assertEqual([item["status"] for item in results], ["created", "conflict"])
+        self.assertEqual(results[0]["id"], String.objects.get(value="alpha").id)
+        self.assertNotIn("id", results[1])
+        self.assertEqual(filter_contains_character(String.objects.all(), "p").get().value, "alpha")
+
+    def test_rejects_non_array_json(self):
+        response = self.client.post(reverse("create_string_batch"), {"value": "x"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(ROOT_URLCONF="api.urls")
+class StringHashLookupTests(APITestCase):
+    def test_create_then_duplicate_conflicts_on_unique_hash(self):
+        response = self.client.post(reverse("create_string"), {"value": "hello world"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["properties"]["sha256_hash"], String.digest("hello world"))
+        self.assertTrue(StringCharacter.objects.filter(string_id=response.data["id"]).exists())
+
+        response = self.client.post(reverse("create_string"), {"value": "hello world"}, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(String.objects.count(), 1)
+
+    def test_get_and_delete_by_value_use_hash(self):
+        string = make_string("look me up")
+        url = reverse("delete_string", kwargs={"string_value": "look me up"})
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).data["id"], string.id)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_by_hash_endpoint(self):
+        string = make_string("by hash")
+        url = reverse("string_by_hash", kwargs={"sha256_hash": string.sha256_hash.upper()})
+        self.assertEqual(self.client.get(url).data["value"], "by hash")
+        missing = reverse("string_by_hash", kwargs={"sha256_hash": String.digest("missing")})
+        self.assertEqual(self.client.get(missing).status_code, 404)
+        invalid = reverse("string_by_hash", kwargs={"sha256_hash": "not-a-hash"})
+        self.assertEqual(self.client.get(invalid).status_code, 400)
+
+
+class StringPropertiesTests(TestCase):
+    VALUES = [
+        "",
+        "A man a plan",
+        "  Racecar  ",
+        "Never odd or even\tnever\nodd",
+        "ñandú café ÑANDÚ",
+        "word\u00a0split\u2003here",
+    ]
+
+    def legacy_properties(self, value):
+        cleaned_value = value.lower()
+        return {
+            "length": len(value),
+            "sha256_hash": hashlib.sha256(value.encode("utf-8")).hexdigest(),
+            "unique_characters": len(set(value)),
+            "is_palindrome": cleaned_value == cleaned_value[::-1],
+            "word_count": len(value.split()),
+            "character_frequency_map": dict(Counter(value)),
+        }
+
+    def assertMatchesLegacy(self, value):
+        actual = properties.compute_properties(value)
+        self.assertEqual(actual, self.legacy_properties(value))
+        # key order of the frequency map is part of the stored JSON
+        self.assertEqual(list(actual["character_frequency_map"]), list(Counter(value)))
+
+    def test_small_path_matches_legacy(self):
+        for value in self.VALUES:
+            self.assertMatchesLegacy(value)
+
+    def test_large_path_matches_legacy(self):
+        with mock.patch.object(properties, "LARGE_INPUT_THRESHOLD", 0), \
+                mock.patch.object(properties, "HASH_CHUNK_SIZE", 3):
+            for value in self.VALUES + ["\x0b\x0cab\x1c\x1dcd\x1e\x1f", "abc" * 1000 + " cba"]:
+                self.assertMatchesLegacy(value)
+
+    def test_batch_preserves_order(self):
+        self.assertEqual(
+            properties.compute_batch(self.VALUES, workers=0),
+            [self.legacy_properties(value) for value in self.VALUES],
+        )
+
+
+@override_settings(ROOT_URLCONF="api.urls")
+class FrequencyMapStorageTests(APITestCase):
+    def test_packed_round_trip_keeps_key_order(self):
+        frequency_map = {"z": 3, "a": 1, "ñ": 70000, "\U0001f600": 2}
+        packed = properties.pack_frequency_map(frequency_map)
+        self.assertEqual(list(properties.unpack_frequency_map(packed).items()), list(frequency_map.items()))
+
+    @override_settings(STRING_FREQUENCY_ENCODING="packed")
+    def test_packed_strings_serialize_like_json_ones(self):
+        response = self.client.post(reverse("create_string"), {"value": "banana"}, format="json")
+        string = String.objects.get()
+        self.assertIsNone(string.character_frequency_map)
+        self.assertIsNotNone(string.character_frequency_blob)
+        self.assertEqual(response.data["properties"]["character_frequency_map"], {"b": 1, "a": 3, "n": 2})
+        self.assertEqual(StringSerializer(string).data["properties"]["character_frequency_map"], {"b": 1, "a": 3, "n": 2})
+        self.assertEqual(filter_contains_character(String.objects.all(), "N").get(), string)
+
+    def test_fields_limit_properties_and_skip_the_map(self):
+        make_string("level")
+        url = reverse("list_strings")
+        body = self.client.get(url + "?paginate=false").json()
+        self.assertIn("character_frequency_map", body["data"][0]["properties"])
+
+        body = self.client.get(url + "?fields=length,is_palindrome").json()
+        self.assertEqual(body["data"][0]["properties"], {"length": 5, "is_palindrome": True})
+
+        body = self.client.get(url + "?fields=length&include=frequency").json()
+        self.assertEqual(body["data"][0]["properties"], {"length": 5, "character_frequency_map": {"l": 2, "e": 2, "v": 1}})
+
+        self.assertEqual(self.client.get(url + "?fields=bogus").status_code, 400)
+        self.assertEqual(self.client.get(url + "?include=bogus").status_code, 400)
+
+    def test_convert_command_switches_encoding(self):
+        string = make_string("hello")
+        call_command("convert_frequency_maps", encoding="packed", stdout=open(os.devnull, "w"))
+        string = String.objects.get(pk=string.pk)
+        self.assertIsNone(string.character_frequency_map)
+        self.assertEqual(string.frequency_map, {"h": 1, "e": 1, "l": 2, "o": 1})
+
+        call_command("convert_frequency_maps", encoding="json", stdout=open(os.devnull, "w"))
+        string = String.objects.get(pk=string.pk)
+        self.assertIsNone(string.character_frequency_blob)
+        self.assertEqual(string.character_frequency_map, {"h": 1, "e": 1, "l": 2, "o": 1})
+
+
+@override_settings(ROOT_URLCONF="api.urls")
+class StringFastSerializerTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        make_string("Racecar")
+        make_string("line\u2028separator ñ")
+        with override_settings(STRING_FREQUENCY_ENCODING="packed"):
+            make_string("level")
+
+    def test_rows_render_identically_to_model_serializer(self):
+        expected = JSONRenderer().render(StringSerializer(String.objects.order_by("pk"), many=True).data)
+        columns, to_dicts = string_row_serializer()
+        fast = to_dicts(String.objects.order_by("pk").values(*columns))
+        self.assertEqual(JSONRenderer().render(fast), expected)
+        self.assertEqual(ORJSONRenderer().render(fast), expected)
+
+    def test_orjson_renderer_falls_back_for_big_ints(self):
+        data = {"total_estimated_gdp": 2 ** 70, "rate": 1.5}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_list_endpoints_match_model_serializer(self):
+        expected = StringSerializer(String.objects.order_by("pk"), many=True).data
+        self.assertEqual(self.client.get(reverse("list_strings") + "?paginate=false").json()["data"], expected)
+        body = self.client.get(reverse("filter_by_natural_language"), {"query": "palindromic strings"}).json()
+        self.assertEqual(body["data"], [expected[0], expected[2]])
+
+
+@override_settings(ROOT_URLCONF="api.urls")
+class NaturalLanguageQueryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        for value in ["a", "noon", "racecar", "level up", "zz", "abcdefghijkl"]:
+            make_string(value)
+
+    def query(self, text):
+        return self.client.get(reverse("filter_by_natural_language"), {"query": text})
+
+    def test_parse_to_normalized_filters(self):
+        self.assertEqual(parse_query("All  Single-Word PALINDROMIC strings"), StringFilter(word_count=1, is_palindrome=True))
+        self.assertEqual(
+            parse_query("strings longer than 2 and shorter than 8 containing the letter c"),
+            StringFilter(min_length=3, max_length=7, contains_character="c"),
+        )
+        self.assertIs(parse_query("palindromes  less than 5"), parse_query("PALINDROMES less than 5"))
+        self.assertTrue(parse_query("what is this").is_empty())
+        self.assertTrue(parse_query("longer than 10 and shorter than 5").is_conflicting())
+
+    def test_max_length_is_applied(self):
+        body = self.query("palindromic strings shorter than 5").json()
+        self.assertEqual([item["value"] for item in body["data"]], ["a", "noon", "zz"])
+        self.assertEqual(body["interpreted_query"]["parsed_filters"], {"is_palindrome": True, "max_length": 4})
+
+    def test_errors(self):
+        self.assertEqual(self.query("tell me a joke").status_code, 400)
+        self.assertEqual(self.query("longer than 10 and shorter than 5").status_code, 422)
+
+    def test_results_cached_until_strings_change(self):
+        self.assertEqual(self.query("strings containing the letter z").json()["count"], 1)
+        # the matching ids come from the cache; only the rows are loaded
+        with self.assertNumQueries(1):
+            self.assertEqual(self.query("Strings containing the letter  Z").json()["count"], 1)
+
+        self.client.post(reverse("create_string"), {"value": "zebra"}, format="json")
+        self.assertEqual(self.query("strings containing the letter z").json()["count"], 2)
+        # the batch is stored as its response streams
+        b"".join(self.client.post(reverse("create_string_batch"), ["pizza"], format="json").streaming_content)
+        self.assertEqual(self.query("strings containing the letter z").json()["count"], 3)
+        self.client.delete(reverse("delete_string", kwargs={"string_value": "zz"}))
+        self.assertEqual(self.query("strings containing the letter z").json()["count"], 2)
+
+
+class FactServer:
+    """Local upstream answering with ``statuses`` in turn (then 200 + ``fact``), optionally hanging first."""
+
+    def __init__(self, fact="cats sleep a lot", statuses=()):
+        self.fact = fact
+        self.statuses = list(statuses)
+        self.delay = 0.0
+        self.hits = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                server.hits += 1
+                time.sleep(server.delay)
+                code = server.statuses.pop(0) if server.statuses else 200
+                body = json.dumps({"fact": server.fact}).encode()
+                handler.send_response(code)
+                handler.send_header("Content-Type", "application/json")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/fact"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(HTTP_RETRY_BACKOFF=0)
+class HttpClientTests(SimpleTestCase):
+    def setUp(self):
+        http_client.reset_breakers()
+
+    def test_retries_retryable_statuses(self):
+        with FactServer(statuses=[503, 502]) as upstream:
+            response = http_client.get(upstream.url, timeout=2, retries=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(upstream.hits, 3)
+
+    def test_circuit_opens_then_half_opens(self):
+        breaker = http_client.CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.15)
+        self.assertTrue(breaker.allow())
+        # only one trial call while half-open
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+
+    @override_settings(HTTP_CIRCUIT_FAILURE_THRESHOLD=1)
+    def test_open_circuit_fails_fast(self):
+        with FactServer(statuses=[503]) as upstream:
+            self.assertEqual(http_client.get(upstream.url, timeout=2, retries=0).status_code, 503)
+            with self.assertRaises(http_client.CircuitOpen):
+                http_client.get(upstream.url, timeout=2)
+        self.assertEqual(upstream.hits, 1)
+
+    @override_settings(HTTP_CIRCUIT_FAILURE_THRESHOLD=2)
+    def test_server_errors_open_circuit(self):
+        with FactServer(statuses=[500, 500]) as upstream:
+            for _ in range(2):
+                self.assertEqual(http_client.get(upstream.url, timeout=2, retries=2).status_code, 500)
+            with self.assertRaises(http_client.CircuitOpen):
+                http_client.get(upstream.url, timeout=2)
+        # 500 is not retried
+        self.assertEqual(upstream.hits, 2)
+
+    @override_settings(HTTP_CIRCUIT_FAILURE_THRESHOLD=2)
+    async def test_async_server_errors_open_circuit(self):
+        with FactServer(statuses=[500, 501]) as upstream:
+            for code in (500, 501):
+                self.assertEqual((await http_client.aget(upstream.url, timeout=2, retries=2)).status_code, code)
+            with self.assertRaises(http_client.CircuitOpen):
+                await http_client.aget(upstream.url, timeout=2)
+        self.assertEqual(upstream.hits, 2)
+
+    def half_open(self, url):
+        breaker = http_client.get_breaker(url)
+        breaker.record_failure()
+        time.sleep(0.06)
+        return breaker
+
+    @override_settings(HTTP_CIRCUIT_FAILURE_THRESHOLD=1, HTTP_CIRCUIT_RESET_TIMEOUT=0.05)
+    def test_unexpected_error_ends_half_open_trial(self):
+        url = "http://upstream.invalid/fact"
+        breaker = self.half_open(url)
+        session = mock.Mock()
+        session.request.side_effect = requests.exceptions.InvalidURL("bad url")
+        with self.assertRaises(requests.exceptions.InvalidURL):
+            http_client.get(url, session=session, retries=2)
+        self.assertEqual(session.request.call_count, 1)
+        self.assertFalse(breaker.allow())
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+
+    @override_settings(HTTP_CIRCUIT_FAILURE_THRESHOLD=1, HTTP_CIRCUIT_RESET_TIMEOUT=0.05)
+    async def test_cancelled_call_ends_half_open_trial(self):
+        url = "http://upstream.invalid/fact"
+        breaker = self.half_open(url)
+        client = mock.Mock()
+
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        client.request = hang
+        task = asyncio.ensure_future(http_client.aget(url, client=client))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertFalse(breaker.allow())
+        await asyncio.sleep(0.06)
+        self.assertTrue(breaker.allow())
+
+
+@override_settings(HTTP_RETRY_BACKOFF=0)
+class CatFactCacheTests(SimpleTestCase):
+    def setUp(self):
+        http_client.reset_breakers()
+
+    def test_stale_fact_served_while_upstream_hangs(self):
+        with FactServer() as upstream:
+            facts = CatFactCache(upstream.url, timeout=3, ttl=0, max_stale=60, cold_wait=2)
+            self.assertEqual(facts.get(), "cats sleep a lot")
+
+            upstream.delay = 1.0
+            latencies = []
+            for _ in range(100):
+                start = time.perf_counter()
+                self.assertEqual(facts.get(), "cats sleep a lot")
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            self.assertLess(latencies[98], 0.01)
+            # one background refresh at a time, not one upstream call per request
+            time.sleep(0.2)
+            self.assertEqual(upstream.hits, 2)
+
+    def test_cold_cache_waits_at_most_cold_wait(self):
+        with FactServer() as upstream:
+            upstream.delay = 1.0
+            facts = CatFactCache(upstream.url, timeout=3, cold_wait=0.1)
+            start = time.perf_counter()
+            self.assertEqual(facts.get(), UNREACHABLE_FACT)
+            self.assertLess(time.perf_counter() - start, 0.5)
+
+    @override_settings(ROOT_URLCONF="api.urls")
+    def test_me_endpoint_uses_cache(self):
+        with FactServer(fact="cats purr") as upstream:
+            with mock.patch("api.views.cat_facts", CatFactCache(upstream.url, timeout=2)):
+                self.assertEqual(self.client.get(reverse("userprofile")).json()["fact"], "cats purr")
+                self.assertEqual(self.client.get(reverse("userprofile")).json()["fact"], "cats purr")
+        self.assertEqual(upstream.hits, 1)
+
+    async def test_async_view_shares_one_cold_fetch(self):
+        with FactServer(fact="cats purr") as upstream:
+            upstream.delay = 0.2
+            facts = CatFactCache(upstream.url, timeout=2)
+            view = AsyncUserprofile.as_view()
+            with mock.patch("api.views.cat_facts", facts):
+                responses = await asyncio.gather(*(view(AsyncRequestFactory().get("/me")) for _ in range(20)))
+        self.assertEqual({json.loads(response.content)["fact"] for response in responses}, {"cats purr"})
+        self.assertEqual(upstream.hits, 1)
@@ -1,9 +1,16 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# ASYNC_VIEWS swaps in the native async variants of the outbound-I/O views (for ASGI servers)
+ProfileView = views.AsyncUserprofile if settings.ASYNC_VIEWS else views.Userprofile
+
 urlpatterns = [
-    path('me', views.Userprofile.as_view(), name="userprofile"),
+    path('me', ProfileView.as_view(), name="userprofile"),
     path('strings', views.create_string.as_view(), name='create_string'),
+    path('strings/export', views.string_export.as_view(), name='export_strings'),
+    path('strings/batch', views.create_string_batch.as_view(), name='create_string_batch'),
+    path('strings/by-hash/<str:sha256_hash>', views.string_by_hash.as_view(), name='string_by_hash'),
    # path('strings/<str:string_value>/', views.get_string.as_view(), name='get_string'), 
     path('strings/<str:string_value>/', views.delete_string.as_view(), name='delete_string'),
     path('strings/', views.string_list.as_view(), name='list_strings'), 
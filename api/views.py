@@ -1,19 +1,25 @@
 from django.shortcuts import render
-import requests
 from datetime import datetime, timezone
 from rest_framework.response import Response
 from rest_framework import status
 import logging
 from rest_framework.views import APIView
 from decouple import config
-from . models import String
-from . serializer import ValidateString, StringSerializer
-import hashlib
+from . models import String, StringCharacter
+from . serializer import PROPERTY_FIELDS, ValidateString, StringSerializer, string_row_serializer
+from .properties import compute_properties
+from .facts import CatFactCache
+from .nlq import STRINGS_CACHE_NAMESPACE, filter_contains_character, matching_ids, parse_query, rows_for_ids
+from .ingest import encode_results, ingest_strings, parse_ndjson
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
-from collections import Counter
+from django.db import IntegrityError, transaction
 import re
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
+from catapi.cache import bump_generation
+from catapi.renderers import json_response
+from django.views import View
+from catapi.streaming import EXPORT_FORMATS, export_response
+from catapi.pagination import CURSOR_PARAM, InvalidCursor, KeysetPaginator, page_link, wants_pagination
 
 HTTP_422_UNPROCESSABLE_ENTITY = 422
 
@@ -29,35 +35,33 @@ STACK = config("Stack")
 CAT_URL = config("Api_url")
 REQUEST_TIMEOUT = config("Timeout", cast=int)
 
+cat_facts = CatFactCache(CAT_URL, REQUEST_TIMEOUT)
+
+def profile_payload(fact):
+    return {
+        'status': "success",
+        'user': {
+            "email": EMAIL,
+            "name": NAME,
+            "stack":  STACK
+            
+        },
+        "timestamp" : datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+        "fact" : fact
+        
+    }
+
+
 class Userprofile(APIView):
     def get(self, request):
-        response_data = {
-            'status': "success",
-            'user': {
-                "email": EMAIL,
-                "name": NAME,
-                "stack":  STACK
-                
-            },
-            "timestamp" : datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
-            "fact" : ""
-            
-        }
-        try:
-            response = requests.get(CAT_URL, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            api_response = response.json()
-            api_fact = api_response.get('fact', 'Cats are wonderful pets')
+        # served from memory; a stale fact triggers a background refresh instead of blocking
+        return Response(profile_payload(cat_facts.get()), status=status.HTTP_200_OK)    
             
-            response_data["fact"] = api_fact
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Cat api failed: {str(e)} ")    
-            response_data["fact"] = "cats are greats but api is unreachable"
-        except ValueError:
-            logger.error("api didnt return as a valid json")
-            response_data["fact"] = "cats are still great but api didnt return a valid json"
-         
-        return Response(response_data, status=status.HTTP_200_OK)    
+
+class AsyncUserprofile(View):
+    """Native async /me for ASGI deployments (``ASYNC_VIEWS``); a cold fact cache is awaited, not blocked on."""
+    async def get(self, request):
+        return json_response(profile_payload(await cat_facts.aget()), status=status.HTTP_200_OK)
             
 class String_Properties:
     def stringproperities(self, value):
@@ -65,26 +69,31 @@ class String_Properties:
         if not isinstance(value, str):
             raise ValidationError ("value must be a string")
         
-        cleaned_value = value.lower()
-        length = len(value)
-        sha256_hash = hashlib.sha256(value.encode("utf-8")).hexdigest()
-        unique_characters = len(set(value))      
-        is_palindrome = cleaned_value == cleaned_value[::-1]
-        word_count = len(value.split())
-        character_frequency_map  = dict(Counter(value))
+        return compute_properties(value)
         
         
-        return {
-            
-            "length" : length,
-            "sha256_hash" : sha256_hash,
-            'unique_characters' : unique_characters,
-            "is_palindrome" : is_palindrome,
-            "word_count" : word_count,
-            "character_frequency_map" : character_frequency_map
-            
-            }
-        
+def requested_property_fields(request):
+    """
+    Property keys asked for with ``?fields=a,b`` (``?include=frequency`` adds
+    the frequency map); None means all of them.
+
+    Raises ValueError for unknown names.
+    """
+    fields = [field for field in request.query_params.get("fields", "").split(",") if field]
+    include = [field for field in request.query_params.get("include", "").split(",") if field]
+    for name in include:
+        if name != "frequency":
+            raise ValueError(f"include must be 'frequency', got '{name}'")
+    if not fields:
+        return None
+    if include:
+        fields.append("character_frequency_map")
+    unknown = set(fields) - set(PROPERTY_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(field for field in PROPERTY_FIELDS if field in fields)
+
+
 class create_string(APIView):
     def post(self, request):
         input_serializer =  ValidateString(data=request.data)
@@ -95,39 +104,49 @@ class create_string(APIView):
         if not input_serializer.is_valid():
             return Response( {"error": "Invalid request body or missing 'value' field"}, status=status.HTTP_400_BAD_REQUEST)
         
+        properties = String_Properties().stringproperities(string_value)
+        new_string = String.from_properties(string_value, properties)
+        
+        # the unique sha256_hash decides duplicates, so concurrent inserts cannot both win
         try:
-            existing_instance = String.objects.get(value=string_value)
+            with transaction.atomic():
+                new_string.save()
+                StringCharacter.index_strings([new_string])
+        except IntegrityError:
             return Response (
                 {"error" : "String already exists in the system"},
                 status=status.HTTP_409_CONFLICT
             )
-        except String.DoesNotExist:
-            pass
-        
-        properties = String_Properties().stringproperities(string_value)
-        
-        new_string = String(
-            value = string_value,
-            id = properties["sha256_hash"],
-            length = properties["length"],
-            sha256_hash = properties['sha256_hash'],
-            is_palindrome = properties['is_palindrome'],
-            unique_characters = properties['unique_characters'],
-            word_count = properties["word_count"],
-            character_frequency_map = properties['character_frequency_map']
-        )
-        
-        
-        new_string.save()
         
+        bump_generation(STRINGS_CACHE_NAMESPACE)
         output_json = StringSerializer(new_string)
         
         return Response(output_json.data, status=status.HTTP_201_CREATED)
  
+class create_string_batch(APIView):
+    NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+    
+    def post(self, request):
+        content_type = request.content_type.split(";")[0].strip().lower()
+        if content_type in self.NDJSON_CONTENT_TYPES:
+            # read line by line so the raw body is never held in memory at once
+            stream = request.stream
+            items = parse_ndjson(iter(stream.readline, b"")) if stream is not None else []
+        else:
+            items = request.data
+            if not isinstance(items, list):
+                return Response(
+                    {"error": "Request body must be a JSON array or NDJSON"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        # chunks are stored as the response streams, so results never pile up in memory
+        return StreamingHttpResponse(encode_results(ingest_strings(items)), content_type="application/json")
+ 
 class get_string(APIView):
     def get_string(self, string):
         try:
-            object = String.objects.get(value=string)
+            object = String.objects.get(sha256_hash=String.digest(string))
             return object
         except String.DoesNotExist:
             return Response(
@@ -150,7 +169,12 @@ class   string_list(APIView):
         word_count = request.query_params.get("word_count", None)
         contains_character = request.query_params.get("contains_character", None)
         
-        
+        try:
+            property_fields = requested_property_fields(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # read-only fast path: only the needed columns, as plain rows
+        columns, to_dicts = string_row_serializer(property_fields)
         
         if is_palindrome is not None:
             is_palindrome_bool = is_palindrome.lower() ==  "true"
@@ -188,33 +212,64 @@ class   string_list(APIView):
                 
                 
         if contains_character  is not None:
-            queryset = queryset.filter(value__icontains=contains_character)       
+            queryset = filter_contains_character(queryset, contains_character)       
             
             
-        serializer = StringSerializer(queryset, many=True)     
-       
-       
+        filters_applied = {
+            "is_palindrome" : is_palindrome,
+            "min_length" : min_length,
+            "max_length" : max_length,
+            "word_count" : word_count,
+            "contains_character" : contains_character
+        }
+        
+        queryset = queryset.values(*columns)
+        
+        if not wants_pagination(request):
+            data = to_dicts(queryset)
+            Response_date = {
+                "data" : data,
+                "count" : len(data),
+                'filters_applied' : filters_applied,
+            }
+            return Response(Response_date, status=status.HTTP_200_OK)
+        
+        try:
+            paginator = KeysetPaginator.from_request(request)
+            rows, next_cursor, previous_cursor = paginator.paginate(
+                queryset, request.query_params.get(CURSOR_PARAM)
+            )
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = to_dicts(rows)
         Response_date = {
-           "data" : serializer.data,
-           "count" : queryset.count(),
-           'filters_applied' : {
-               "is_palindrome" : is_palindrome,
-               "min_length" : min_length,
-               "max_length" : max_length,
-               "word_count" : word_count,
-               "contains_character" : contains_character
-               
-           }
-       }
+            "data" : data,
+            "count" : len(data),
+            "next" : page_link(request, next_cursor),
+            "previous" : page_link(request, previous_cursor),
+            'filters_applied' : filters_applied,
+        }
        
        
         return Response(Response_date, status=status.HTTP_200_OK)
    
    
+class string_export(APIView):
+    def get(self, request):
+        export_format = request.query_params.get("output", "json")
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"output must be one of {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return export_response(String.objects.all(), StringSerializer, export_format, "strings")
+   
+   
 class delete_string(APIView):
     def get_data(self, string):
         try:
-            object = String.objects.get(value=string)
+            object = String.objects.get(sha256_hash=String.digest(string))
             return object
         except String.DoesNotExist:
             raise Http404
@@ -229,6 +284,7 @@ class delete_string(APIView):
                 status=status.HTTP_404_NOT_FOUND)
             
         instance.delete()
+        bump_generation(STRINGS_CACHE_NAMESPACE)
         return Response(status=status.HTTP_204_NO_CONTENT)  
     
     def get(self, request, string_value):
@@ -250,6 +306,27 @@ class delete_string(APIView):
     
     
     
+class string_by_hash(APIView):
+    SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+    
+    def get(self, request, sha256_hash):
+        sha256_hash = sha256_hash.lower()
+        if not self.SHA256_PATTERN.fullmatch(sha256_hash):
+            return Response(
+                {"error": "sha256_hash must be 64 hexadecimal characters"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            instance = String.objects.get(sha256_hash=sha256_hash)
+        except String.DoesNotExist:
+            return Response(
+                {"error": "String does not exist in the system"},
+                status=status.HTTP_404_NOT_FOUND)
+        
+        serializer = StringSerializer(instance)
+        return Response (serializer.data, status=status.HTTP_200_OK)
+
+
 class natural_lang(APIView):
     def get(self,request):
         query =  request.query_params.get("query", None)
@@ -258,90 +335,32 @@ class natural_lang(APIView):
                 {"error": "Unable to parse natural language query"}, status=status.HTTP_400_BAD_REQUEST
             )    
             
-        parsed_filters = {}
-        cleaned_query =  query.lower()
-        
-         # Example: "all single word palindromic strings"
-         
-        if  "single word" in cleaned_query or "single-word" in cleaned_query:
-             parsed_filters["word_count"] = 1
-        if "palindromic" in cleaned_query or "palindrome" in cleaned_query:
-             parsed_filters["is_palindrome"] = True
-             
-          # Example: "strings longer than 10 characters"
-        if "longer than" in cleaned_query:
-              
-              match = re.search(r"than\s+(\d+)", cleaned_query)
-              if match:
-                  try:
-                      min_len = int(match.group(1)) + 1
-                      parsed_filters['min_length'] = min_len
-                  except ValueError:
-                      pass
-                  
-                  
-         # Example: "strings containing the letter z"
-         
-        contains_match = re.search(r"containing.*letter\s+([a-z])", cleaned_query)
-        if contains_match:
-            char = contains_match.group(1)
-            parsed_filters['contains_character'] = char
-            
-        shorter_than_match = re.search(r"shorter\s+than\s+(\d+)", cleaned_query)
-        if shorter_than_match:
-            try:
-                max_len = int(shorter_than_match.group(1)) - 1 
-                parsed_filters['max_length'] = max_len
-            except ValueError:
-                pass    
-            
-        less_than_match = re.search(r"less\s+than\s+(\d+)", cleaned_query)
-        if less_than_match:
-            try:
-                max_len = int(less_than_match.group(1)) - 1 
-                parsed_filters['max_length'] = max_len 
-            except ValueError:
-                pass
+        string_filter = parse_query(query)
         
-            
-        min_len = parsed_filters.get('min_length')
-        max_len = parsed_filters.get('max_length')    
-        
-        if min_len is not None and max_len is not None and min_len > max_len:
+        if string_filter.is_conflicting():
             return Response( {"error": "Query parsed but resulted in conflicting filters"}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
-            
         
-        
-        
-        if not parsed_filters:
+        if string_filter.is_empty():
             return Response(
                  {"error": "Unable to parse natural language query"}, status=status.HTTP_400_BAD_REQUEST
             )      
                   
-        queryset = String.objects.all()
-       
-       
-        if 'is_palindrome' in parsed_filters:
-            queryset = queryset.filter(is_palindrome=parsed_filters['is_palindrome'])
-        if 'word_count' in parsed_filters:
-            queryset = queryset.filter(word_count=parsed_filters['word_count'])
-        if 'min_length' in parsed_filters:
-            queryset = queryset.filter(length__gte=parsed_filters['min_length'])
-        if 'contains_character' in parsed_filters:
-            queryset = queryset.filter(value__icontains=parsed_filters['contains_character'])                       
-            
-            
-            
-            
-        serializer = StringSerializer(queryset, many=True)
+        try:
+            property_fields = requested_property_fields(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        columns, to_dicts = string_row_serializer(property_fields)
+        
+        ids = matching_ids(string_filter, String.objects.all())
+        data = to_dicts(rows_for_ids(String.objects.all(), ids, columns))
        
        
         response_data = {
-            "data": serializer.data,
-            "count": queryset.count(),
+            "data": data,
+            "count": len(data),
             "interpreted_query": {
                 "original": query,
-                "parsed_filters": parsed_filters
+                "parsed_filters": string_filter.as_dict()
             }
         }
 
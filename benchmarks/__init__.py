@@ -0,0 +1,8 @@
+"""
+Performance benchmarks for the catapi project.
+
+Each module is runnable on its own, e.g. ``python -m benchmarks.export_memory``.
+They run against a throwaway SQLite database by default (see
+``benchmarks.settings``); set ``BENCH_DB=default`` to use the configured
+project database instead.
+"""
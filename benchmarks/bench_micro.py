@@ -0,0 +1,60 @@
+"""
+Microbenchmarks (pytest-benchmark): string properties, list serialization
+and the summary image, against the database seeded by conftest.py.
+"""
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from api.models import String
+from api.serializer import StringSerializer, string_row_serializer
+from api.views import String_Properties
+from benchmarks.string_properties import make_value
+from countryapi.models import Country
+from countryapi.serializer import COUNTRY_COLUMNS, CountrySerializer, countries_to_dicts
+from countryapi.summary_image import generate_summary_image
+
+# rows serialized per list benchmark, whatever the size of the seeded table
+LIST_ROWS = 1000
+
+
+@pytest.mark.parametrize("ascii_only", [True, False], ids=["ascii", "utf8"])
+@pytest.mark.parametrize("size", [1024, 64 * 1024, 1024 * 1024])
+def bench_string_properties(benchmark, size, ascii_only):
+    value = make_value(size, ascii_only)
+    result = benchmark(String_Properties().stringproperities, value)
+    assert result["length"] == size
+
+
+def bench_string_serializer(benchmark):
+    rows = list(String.objects.order_by("pk")[:LIST_ROWS])
+    benchmark(lambda: StringSerializer(rows, many=True).data)
+
+
+def bench_string_rows(benchmark):
+    columns, to_dicts = string_row_serializer()
+    rows = list(String.objects.order_by("pk")[:LIST_ROWS].values(*columns))
+    benchmark(lambda: JSONRenderer().render(to_dicts(rows)))
+
+
+def bench_string_list_query(benchmark):
+    columns, to_dicts = string_row_serializer()
+    benchmark(lambda: to_dicts(String.objects.order_by("pk")[:LIST_ROWS].values(*columns)))
+
+
+def bench_country_serializer(benchmark):
+    countries = list(Country.objects.order_by("pk"))
+    benchmark(lambda: CountrySerializer(countries, many=True).data)
+
+
+def bench_country_rows(benchmark):
+    rows = list(Country.objects.order_by("pk").values(*COUNTRY_COLUMNS))
+    benchmark(lambda: JSONRenderer().render(countries_to_dicts(rows)))
+
+
+def bench_summary_image_redraw(benchmark):
+    assert benchmark(generate_summary_image, force=True)
+
+
+def bench_summary_image_unchanged(benchmark):
+    generate_summary_image()
+    assert not benchmark(generate_summary_image)
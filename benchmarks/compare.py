@@ -0,0 +1,90 @@
+"""
+Compare two benchmark result files and fail on regressions.
+
+    python -m benchmarks.compare baseline.json current.json --threshold 10
+
+Reads the JSON written by the benchmark scripts (``harness.write_results``)
+or by ``pytest --benchmark-json``. Rows are matched on their non-metric
+fields (endpoint, size, rows, ...). Metrics are the fields ending in
+``seconds``, ``_ms``, ``_us`` or ``_kb`` (lower is better),
+``_per_second`` (higher is better) and ``errors``. Exits with status 1
+when any metric is worse than the baseline by more than ``--threshold``
+percent, or when errors appear.
+"""
+import argparse
+import json
+import sys
+
+
+LOWER_IS_BETTER = ("seconds", "_ms", "_us", "_kb")
+HIGHER_IS_BETTER = ("_per_second",)
+
+
+def direction(key):
+    """-1 when lower is better, 1 when higher is better, None for fields that identify the row."""
+    if key == "errors" or key.endswith(LOWER_IS_BETTER):
+        return -1
+    if key.endswith(HIGHER_IS_BETTER):
+        return 1
+    return None
+
+
+def load_rows(path):
+    with open(path) as fh:
+        data = json.load(fh)
+    if isinstance(data, dict) and "benchmarks" in data:
+        # pytest-benchmark: compare the median of each test
+        return [{"name": bench["fullname"], "median_seconds": bench["stats"]["median"]} for bench in data["benchmarks"]]
+    return data if isinstance(data, list) else [data]
+
+
+def row_key(row):
+    return tuple(sorted((key, json.dumps(value, sort_keys=True)) for key, value in row.items()
+                        if direction(key) is None))
+
+
+def compare(baseline, current, threshold):
+    """Yield ``(key, metric, old, new, change_percent, regressed)`` for every metric in both files."""
+    baseline_rows = {row_key(row): row for row in baseline}
+    for row in current:
+        key = row_key(row)
+        old_row = baseline_rows.get(key)
+        if old_row is None:
+            continue
+        for metric, new in row.items():
+            sign = direction(metric)
+            old = old_row.get(metric)
+            if sign is None or not isinstance(new, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            if metric == "errors":
+                yield key, metric, old, new, None, new > old
+                continue
+            if old == 0:
+                continue
+            change = (new - old) / old * 100
+            yield key, metric, old, new, change, -sign * change > threshold
+
+
+def describe(key):
+    return " ".join(f"{name}={json.loads(value)}" for name, value in key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent")
+    args = parser.parse_args()
+
+    regressions = 0
+    for key, metric, old, new, change, regressed in compare(load_rows(args.baseline), load_rows(args.current),
+                                                            args.threshold):
+        regressions += regressed
+        change_text = "" if change is None else f"{change:+.1f}%"
+        print(f"{'REGRESSION' if regressed else 'ok':>10} {describe(key)} {metric}: {old:.6g} -> {new:.6g} {change_text}")
+    print(f"{regressions} regression(s) past {args.threshold}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+import os
+
+from benchmarks import harness
+
+
+def pytest_addoption(parser):
+    parser.addoption("--bench-strings", type=int, default=10000,
+                     help="strings in the seeded database (10000, 100000, 1000000)")
+
+
+def pytest_configure(config):
+    os.environ.setdefault("SUMMARY_IMAGE_DIR", os.path.join(harness.bench_dir(), "cache"))
+    harness.seeded_database("micro", strings=config.getoption("--bench-strings"))
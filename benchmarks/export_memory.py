@@ -0,0 +1,76 @@
+"""
+Peak memory of the streaming string export as the table grows.
+
+    python -m benchmarks.export_memory --rows 10000 100000 1000000
+
+Every size gets its own SQLite file, seeded once in a separate process.
+The export is then measured in a fresh process, so the reported RSS growth
+covers only the streaming response and should stay flat as rows grow.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks import harness
+
+
+def _database_path(rows):
+    return os.path.join(harness.bench_dir(), f"strings-{rows}.sqlite3")
+
+
+def seed(rows):
+    harness.setup_django(_database_path(rows))
+    harness.seed_strings(rows)
+
+
+def measure(rows, output):
+    harness.setup_django(_database_path(rows))
+    from django.test import RequestFactory
+
+    from api.views import string_export
+
+    request = RequestFactory().get("/strings/export", {"output": output})
+    rss_before = harness.current_rss_kb()
+    start = time.perf_counter()
+
+    response = string_export.as_view()(request)
+    size = sum(len(chunk) for chunk in response.streaming_content)
+
+    elapsed = time.perf_counter() - start
+    growth = max(harness.max_rss_kb() - rss_before, 0)
+    print(f"{rows},{output},{size},{elapsed:.3f},{growth}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--output", choices=["json", "ndjson"], default="ndjson")
+    parser.add_argument("--seed", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--measure", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        return seed(args.seed)
+    if args.measure:
+        return measure(args.measure, args.output)
+
+    results = []
+    print(f"{'rows':>10} {'bytes':>14} {'seconds':>9} {'rss growth KiB':>15}")
+    for rows in args.rows:
+        subprocess.run([sys.executable, "-m", "benchmarks.export_memory", "--seed", str(rows)], check=True)
+        line = subprocess.run(
+            [sys.executable, "-m", "benchmarks.export_memory", "--measure", str(rows), "--output", args.output],
+            check=True, capture_output=True, text=True,
+        ).stdout.strip().splitlines()[-1]
+        _, output, size, elapsed, growth = line.split(",")
+        results.append({"rows": rows, "output": output, "bytes": int(size),
+                        "seconds": float(elapsed), "rss_growth_kb": int(growth)})
+        print(f"{rows:>10} {int(size):>14} {float(elapsed):>9.2f} {int(growth):>15}")
+
+    print("results written to", harness.write_results("export_memory", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+
+# placeholders for the settings/views that read required env vars at import time
+BENCH_ENV_DEFAULTS = {
+    "SECRET_KEY": "bench-not-secret",
+    "DB_NAME": "catapi",
+    "DB_USER": "catapi",
+    "DB_PASSWORD": "catapi",
+    "COUNTRY_URL": "http://127.0.0.1:9/countries",
+    "RATE_URL": "http://127.0.0.1:9/rates",
+    "Email": "bench@example.com",
+    "Name": "bench",
+    "Stack": "django",
+    "Api_url": "http://127.0.0.1:9/fact",
+    "Timeout": "2",
+}
+
+
+def bench_dir():
+    """Directory for benchmark databases and JSON results (``BENCH_DIR``)."""
+    path = os.environ.get("BENCH_DIR") or os.path.join(tempfile.gettempdir(), "catapi-bench")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def setup_django(sqlite_path=None):
+    """Configure Django for a benchmark run and create any missing tables."""
+    for key, value in BENCH_ENV_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+    if sqlite_path:
+        os.environ["BENCH_SQLITE_PATH"] = sqlite_path
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", run_syncdb=True, verbosity=0)
+
+
+def max_rss_kb():
+    """Peak resident set size of this process so far, in KiB."""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KiB on Linux
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+def current_rss_kb():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() // 1024
+    except OSError:
+        return max_rss_kb()
+
+
+def seed_strings(count, batch_size=5000):
+    """Top the String table up to ``count`` synthetic rows."""
+    from api.models import String
+    from api.views import String_Properties
+
+    existing = String.objects.count()
+    properties = String_Properties()
+    for start in range(existing, count, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, count)):
+            value = f"bench string {i} level {i % 97} racecar"
+            batch.append(String.from_properties(value, properties.stringproperities(value)))
+        String.objects.bulk_create(batch)
+
+
+# upstream exchange rates behind the synthetic countries (XXX has none)
+RATES = {"NGN": 1600.5, "USD": 1, "EUR": 0.92, "GBP": 0.79, "JPY": 151.2}
+REGIONS = ["Africa", "Americas", "Asia", "Europe", "Oceania", "Polar"]
+CURRENCIES = ["NGN", "USD", "EUR", "GBP", "JPY", "XXX"]
+
+
+def country_payload(count=250, seed=0):
+    """``count`` synthetic countries in the upstream (restcountries) format; the same for the same seed."""
+    rng = random.Random(seed)
+    return [
+        {
+            "name": f"Country {i:04d}",
+            "capital": f"Capital {i}",
+            "region": REGIONS[i % len(REGIONS)],
+            "population": rng.randint(10_000, 1_500_000_000),
+            "currencies": [{"code": CURRENCIES[i % len(CURRENCIES)]}],
+            "flag": f"https://flagcdn.com/{i}.svg",
+        }
+        for i in range(count)
+    ]
+
+
+def seed_countries(count=250, seed=0):
+    """Upsert ``count`` synthetic countries, as a refresh from :func:`country_payload` would."""
+    from django.utils import timezone
+
+    from countryapi.refresh import build_country_rows, bulk_upsert_countries
+
+    rows, _ = build_country_rows(country_payload(count, seed), RATES)
+    bulk_upsert_countries(rows, timezone.now())
+
+
+def seeded_database(name, strings=0, countries=250):
+    """
+    Set Django up on the SQLite database ``<name>-<strings>.sqlite3`` holding
+    ``strings`` strings and ``countries`` countries, seeding what is missing,
+    and return its path. Later runs reuse the seeded rows.
+    """
+    path = os.path.join(bench_dir(), f"{name}-{strings}.sqlite3")
+    setup_django(path)
+    seed_strings(strings)
+    seed_countries(countries)
+    return path
+
+
+def write_results(name, results):
+    """Write ``results`` as JSON next to the benchmark database and return the path."""
+    path = os.path.join(bench_dir(), f"{name}-{int(time.time())}.json")
+    with open(path, "w") as fh:
+        json.dump(results, fh, indent=2, default=str)
+    return path
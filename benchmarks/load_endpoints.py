@@ -0,0 +1,75 @@
+"""
+Load test of the public endpoints against a seeded database and stub upstreams.
+
+    python -m benchmarks.load_endpoints --strings 10000 --concurrency 50 --requests 2000
+
+Seeds ``--strings`` strings and 250 countries into a SQLite database (reused
+between runs), starts the stub upstreams and one server (gunicorn, or
+uvicorn with ``--server asgi``) pointed at both, then hammers each endpoint
+with ``--concurrency`` httpx clients. Refreshes hold a lock, so they are run
+one at a time (``--refreshes`` of each): a plain refresh, which the stubs
+answer with 304s, and a forced one, which re-evaluates every country.
+Compare result files with ``python -m benchmarks.compare``.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+
+from benchmarks import harness
+from benchmarks.load_me import free_port, hammer, server_command, wait_until_up
+from benchmarks.stubs import StubUpstreams
+
+
+READ_ENDPOINTS = ["/api/countries/", "/api/status/", "/strings/", "/me"]
+REFRESH_ENDPOINTS = ["/api/countries/refresh/", "/api/countries/refresh/?force=true"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strings", type=int, default=10000)
+    parser.add_argument("--countries", type=int, default=250)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--refreshes", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi")
+    parser.add_argument("--upstream-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    database = harness.seeded_database("load", strings=args.strings, countries=args.countries)
+
+    results = []
+    print(f"{'endpoint':>40} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>7}")
+    with StubUpstreams(countries=args.countries, delay=args.upstream_delay) as upstreams:
+        port = free_port()
+        env = dict(os.environ, **harness.BENCH_ENV_DEFAULTS)
+        env.update(upstreams.env())
+        env.update({
+            "DJANGO_SETTINGS_MODULE": "benchmarks.settings",
+            "BENCH_SQLITE_PATH": database,
+            "ASYNC_VIEWS": str(args.server == "asgi"),
+            "SUMMARY_IMAGE_DIR": os.path.join(harness.bench_dir(), "cache"),
+        })
+        server = subprocess.Popen(server_command(args.server, port, args.workers), env=env)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            wait_until_up(base + "/api/status/")
+            runs = [(path, "GET", args.concurrency, args.requests) for path in READ_ENDPOINTS]
+            runs += [(path, "POST", 1, args.refreshes) for path in REFRESH_ENDPOINTS]
+            for path, method, concurrency, total in runs:
+                result = asyncio.run(hammer(base + path, concurrency, total, method=method))
+                result.update({"endpoint": f"{method} {path}", "server": args.server, "workers": args.workers,
+                               "concurrency": concurrency, "strings": args.strings})
+                print(f"{result['endpoint']:>40} {result['requests_per_second']:>10.1f} {result['p50_ms']:>10.1f} "
+                      f"{result['p99_ms']:>10.1f} {result['errors']:>7}")
+                results.append(result)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print("results written to", harness.write_results("load_endpoints", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+/me throughput: sync views on gunicorn (WSGI) against async views on uvicorn (ASGI).
+
+    python -m benchmarks.load_me --concurrency 500 --requests 5000 --upstream-delay 0.2
+
+A local asyncio upstream answers every cat-fact request after
+``--upstream-delay`` seconds. Each server is started in turn with the same
+number of worker processes and hammered by ``--concurrency`` concurrent
+httpx clients. By default the fact cache is disabled (every request waits
+on the upstream); pass ``--cached`` to measure the cached path instead.
+Needs gunicorn and uvicorn installed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+
+from benchmarks import harness
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class SlowUpstream:
+    """Asyncio HTTP server answering every request with a cat fact after ``delay`` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}/fact"
+        self.loop = asyncio.new_event_loop()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request = await reader.readuntil(b"\r\n\r\n")
+                if not request:
+                    break
+                await asyncio.sleep(self.delay)
+                body = json.dumps({"fact": "cats sleep for 70% of their lives"}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def __enter__(self):
+        self.loop.run_until_complete(
+            asyncio.start_server(self.handle, "127.0.0.1", self.port, backlog=4096)
+        )
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def server_command(kind, port, workers):
+    if kind == "wsgi":
+        return [sys.executable, "-m", "gunicorn", "catapi.wsgi:application", "--workers", str(workers),
+                "--bind", f"127.0.0.1:{port}", "--log-level", "warning"]
+    return [sys.executable, "-m", "uvicorn", "catapi.asgi:application", "--workers", str(workers),
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"]
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=30)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+async def hammer(url, concurrency, total, method="GET"):
+    latencies = []
+    errors = 0
+    queue = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        async def worker():
+            nonlocal errors
+            for _ in queue:
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, url)
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": elapsed,
+        "requests_per_second": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def run(kind, args, upstream):
+    port = free_port()
+    env = dict(os.environ, **harness.BENCH_ENV_DEFAULTS)
+    env.update({
+        "DJANGO_SETTINGS_MODULE": "benchmarks.settings",
+        "Api_url": upstream.url,
+        "Timeout": "30",
+        "ASYNC_VIEWS": str(kind == "asgi"),
+    })
+    if not args.cached:
+        env.update({"CAT_FACT_TTL": "0", "CAT_FACT_MAX_STALE": "0"})
+
+    server = subprocess.Popen(server_command(kind, port, args.workers), env=env)
+    try:
+        url = f"http://127.0.0.1:{port}/me"
+        wait_until_up(url)
+        result = asyncio.run(hammer(url, args.concurrency, args.requests))
+    finally:
+        server.terminate()
+        server.wait()
+
+    result.update({"server": kind, "workers": args.workers, "concurrency": args.concurrency,
+                   "upstream_delay": args.upstream_delay, "cached": args.cached})
+    print(f"{kind:>5} {result['requests_per_second']:>10.1f} {result['p50_ms']:>10.1f} "
+          f"{result['p99_ms']:>10.1f} {result['errors']:>7}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--upstream-delay", type=float, default=0.2)
+    parser.add_argument("--cached", action="store_true", help="leave the cat-fact cache on")
+    parser.add_argument("--servers", nargs="+", choices=["wsgi", "asgi"], default=["wsgi", "asgi"])
+    args = parser.parse_args()
+
+    print(f"{'':>5} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>7}")
+    with SlowUpstream(args.upstream_delay) as upstream:
+        results = [run(kind, args, upstream) for kind in args.servers]
+    print("results written to", harness.write_results("load_me", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Refresh with INFO logging: synchronous file handler against the queue pipeline.
+
+    python -m benchmarks.logging_refresh --countries 250 --rounds 20
+
+Times ``bulk_upsert_countries`` creating every country (it logs once per
+created or updated country) and a bare loop of ``logger.info`` calls under
+four logging setups: INFO disabled, INFO written synchronously to a file
+(the old handler), INFO through ``QueueListenerHandler`` as JSON, and the
+same with a per-logger rate limit. Only the time spent on the calling
+thread is measured; that is what a request waits for. ``--write-delay-us``
+adds a sleep to every file write, standing in for a slow or network disk.
+"""
+import argparse
+import logging
+import logging.config
+import os
+import statistics
+import time
+
+from benchmarks import harness
+
+
+class SlowFileHandler(logging.FileHandler):
+    def __init__(self, filename, delay_us=0):
+        super().__init__(filename)
+        self.delay = delay_us / 1e6
+
+    def emit(self, record):
+        super().emit(record)
+        if self.delay:
+            time.sleep(self.delay)
+
+
+def logging_config(setup, path, delay_us):
+    handlers = {
+        "file": {"()": SlowFileHandler, "filename": path, "delay_us": delay_us,
+                 "formatter": "json" if setup != "sync" else "verbose"},
+    }
+    filters = {}
+    handler = "file"
+    if setup in ("queue", "queue_rate_limited"):
+        handlers["queue"] = {
+            "()": "catapi.structured_logging.QueueListenerHandler",
+            "handlers": ["cfg://handlers.file"],
+            "filters": ["rate_limit"] if setup == "queue_rate_limited" else [],
+        }
+        filters["rate_limit"] = {"()": "catapi.structured_logging.RateLimitFilter", "rate": 20}
+        handler = "queue"
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "verbose": {"format": "{levelname} {asctime} {module} {process:d} {thread:d} {message}", "style": "{"},
+            "json": {"()": "catapi.structured_logging.JSONFormatter"},
+        },
+        "filters": filters,
+        "handlers": handlers,
+        "loggers": {
+            "countryapi": {"handlers": [handler], "level": "WARNING" if setup == "off" else "INFO", "propagate": False},
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--countries", type=int, default=250)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--write-delay-us", type=float, default=0)
+    args = parser.parse_args()
+
+    harness.setup_django(os.path.join(harness.bench_dir(), "logging.sqlite3"))
+
+    from django.utils import timezone
+
+    from countryapi.models import Country
+    from countryapi.refresh import build_country_rows, bulk_upsert_countries
+
+    payload = [
+        {"name": f"Country {i:04d}", "capital": f"Capital {i}", "region": "Africa",
+         "population": 10_000 * (i + 1), "currencies": [{"code": "USD"}]}
+        for i in range(args.countries)
+    ]
+    rows, _ = build_country_rows(payload, {"USD": 1})
+
+    log_path = os.path.join(harness.bench_dir(), "logging_refresh.log")
+    logger = logging.getLogger("countryapi.refresh")
+    results = []
+    print(f"{'setup':>20} {'refresh ms':>12} {'info call us':>14}")
+    for setup in ("off", "sync", "queue", "queue_rate_limited"):
+        logging.config.dictConfig(logging_config(setup, log_path, args.write_delay_us))
+
+        # every round creates (and logs) all the countries again
+        refresh_seconds = []
+        for _ in range(args.rounds):
+            Country.objects.all().delete()
+            start = time.perf_counter()
+            bulk_upsert_countries(rows, timezone.now())
+            refresh_seconds.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(args.calls):
+            logger.info("updated for country record for %s", i)
+        call_us = (time.perf_counter() - start) / args.calls * 1e6
+
+        # flush the queue before the next setup replaces the handlers
+        logging.config.dictConfig({"version": 1, "disable_existing_loggers": False})
+        refresh_ms = statistics.median(refresh_seconds) * 1000
+        results.append({"setup": setup, "countries": args.countries, "write_delay_us": args.write_delay_us, "refresh_ms": refresh_ms, "info_call_us": call_us})
+        print(f"{setup:>20} {refresh_ms:>12.2f} {call_us:>14.2f}")
+
+    print("results written to", harness.write_results("logging_refresh", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cost of the metrics middleware (catapi.metrics) per request and per query.
+
+    python -m benchmarks.metrics_overhead --requests 200000 --queries 20000
+
+Times MetricsMiddleware wrapped around a view that does nothing, against
+calling that view directly, and a trivial SQL query with and without the
+query-counting wrapper active.
+"""
+import argparse
+import os
+import time
+
+from benchmarks import harness
+
+
+def per_call_us(func, count, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(count):
+            func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    os.environ["METRICS_ENABLED"] = "True"
+    harness.setup_django(os.path.join(harness.bench_dir(), "metrics.sqlite3"))
+
+    from django.db import connection
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.urls import resolve
+
+    from catapi import metrics
+
+    response = HttpResponse(b'{"total_countries": 250}', content_type="application/json")
+    request = RequestFactory().get("/api/status/")
+    request.resolver_match = resolve("/api/status/")
+
+    def view(request):
+        return response
+
+    middleware = metrics.MetricsMiddleware(view)
+    bare_us = per_call_us(lambda: view(request), args.requests)
+    wrapped_us = per_call_us(lambda: middleware(request), args.requests)
+
+    def query():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+    query()
+    plain_query_us = per_call_us(query, args.queries)
+    token = metrics._current.set(metrics.RequestStats(capture_sql=False))
+    try:
+        counted_query_us = per_call_us(query, args.queries)
+    finally:
+        metrics._current.reset(token)
+
+    results = {
+        "requests": args.requests,
+        "queries": args.queries,
+        "view_us": bare_us,
+        "view_with_middleware_us": wrapped_us,
+        "middleware_overhead_us": wrapped_us - bare_us,
+        "query_us": plain_query_us,
+        "counted_query_us": counted_query_us,
+        "query_overhead_us": counted_query_us - plain_query_us,
+    }
+    print(f"middleware: {wrapped_us - bare_us:.2f} us per request "
+          f"({bare_us:.2f} us bare view, {wrapped_us:.2f} us wrapped)")
+    print(f"query wrapper: {counted_query_us - plain_query_us:.2f} us per query "
+          f"({plain_query_us:.2f} us plain, {counted_query_us:.2f} us counted)")
+    print("results written to", harness.write_results("metrics_overhead", results))
+
+
+if __name__ == "__main__":
+    main()
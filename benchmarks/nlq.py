@@ -0,0 +1,135 @@
+"""
+Natural-language string queries: parsing and end-to-end requests.
+
+    python -m benchmarks.nlq --rows 100000 --requests 2000
+
+Parses a corpus of realistic queries with the original inline regex code
+and with api.nlq (cold and memoized), then replays the corpus against the
+filter-by-natural-language view with the result cache cold and warm.
+"""
+import argparse
+import os
+import random
+import re
+import time
+
+from benchmarks import harness
+
+
+CORPUS = [
+    "all single word palindromic strings",
+    "single-word palindromes",
+    "strings longer than 10 characters",
+    "strings longer than 20 characters containing the letter z",
+    "palindromic strings shorter than 8",
+    "strings containing the letter a",
+    "strings containing the letter e that are less than 12 characters",
+    "single word strings longer than 3",
+    "Palindromes longer than 5 and shorter than 30",
+    "strings containing the first vowel letter a",
+    "All  Single Word  PALINDROMIC strings",
+    "strings less than 4 characters",
+]
+
+
+def legacy_parse(query):
+    """The parsing half of the original natural_lang.get, kept as the baseline."""
+    parsed_filters = {}
+    cleaned_query = query.lower()
+    if "single word" in cleaned_query or "single-word" in cleaned_query:
+        parsed_filters["word_count"] = 1
+    if "palindromic" in cleaned_query or "palindrome" in cleaned_query:
+        parsed_filters["is_palindrome"] = True
+    if "longer than" in cleaned_query:
+        match = re.search(r"than\s+(\d+)", cleaned_query)
+        if match:
+            parsed_filters["min_length"] = int(match.group(1)) + 1
+    contains_match = re.search(r"containing.*letter\s+([a-z])", cleaned_query)
+    if contains_match:
+        parsed_filters["contains_character"] = contains_match.group(1)
+    shorter_than_match = re.search(r"shorter\s+than\s+(\d+)", cleaned_query)
+    if shorter_than_match:
+        parsed_filters["max_length"] = int(shorter_than_match.group(1)) - 1
+    less_than_match = re.search(r"less\s+than\s+(\d+)", cleaned_query)
+    if less_than_match:
+        parsed_filters["max_length"] = int(less_than_match.group(1)) - 1
+    return parsed_filters
+
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_parse(queries):
+    from api import nlq
+
+    legacy = timed(lambda: [legacy_parse(query) for query in queries])
+
+    def cold():
+        nlq._compile.cache_clear()
+        for query in queries:
+            nlq._compile.__wrapped__(nlq.normalize_query(query))
+
+    compiled_cold = timed(cold)
+    [nlq.parse_query(query) for query in CORPUS]
+    compiled_warm = timed(lambda: [nlq.parse_query(query) for query in queries])
+    per_query = {"legacy": legacy, "compiled_cold": compiled_cold, "compiled_warm": compiled_warm}
+    for name, seconds in per_query.items():
+        print(f"parse {name:>14}: {seconds / len(queries) * 1e6:8.2f} µs/query")
+    return {"case": "parse", "queries": len(queries), **{f"{k}_seconds": v for k, v in per_query.items()}}
+
+
+def bench_requests(queries):
+    from django.core.cache import cache
+    from django.test import RequestFactory
+
+    from api.views import natural_lang
+
+    view = natural_lang.as_view()
+    factory = RequestFactory()
+
+    def replay():
+        for query in queries:
+            view(factory.get("/strings/filter-by-natural-language", {"query": query})).render()
+
+    def cold():
+        for query in queries:
+            cache.clear()
+            view(factory.get("/strings/filter-by-natural-language", {"query": query})).render()
+
+    cold_seconds = timed(cold, repeat=1)
+    replay()
+    warm_seconds = timed(replay, repeat=1)
+    print(f"requests cold cache: {cold_seconds / len(queries) * 1e3:8.2f} ms/request")
+    print(f"requests warm cache: {warm_seconds / len(queries) * 1e3:8.2f} ms/request")
+    return {"case": "requests", "requests": len(queries), "cold_seconds": cold_seconds, "warm_seconds": warm_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=100_000, help="parse iterations")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    harness.setup_django(os.path.join(harness.bench_dir(), f"strings-{args.rows}.sqlite3"))
+    harness.seed_strings(args.rows)
+    from django.core.management import call_command
+    call_command("backfill_string_characters", verbosity=0, stdout=open(os.devnull, "w"))
+
+    rng = random.Random(42)
+    results = [
+        bench_parse([rng.choice(CORPUS) for _ in range(args.queries)]),
+        bench_requests([rng.choice(CORPUS) for _ in range(args.requests)]),
+    ]
+    print("results written to", harness.write_results("nlq", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+List serialization: DRF ModelSerializers against the .values() fast path.
+
+    python -m benchmarks.serializers --rows 5000
+
+Times building the response data for the string and country lists both
+ways, and rendering it with DRF's JSONRenderer and the orjson renderer.
+"""
+import argparse
+import os
+import time
+
+from benchmarks import harness
+
+
+def timed(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench(name, serializer, fast):
+    from rest_framework.renderers import JSONRenderer
+
+    from catapi.renderers import ORJSONRenderer, orjson
+
+    serializer_seconds, expected = timed(serializer)
+    fast_seconds, data = timed(fast)
+    drf_render, body = timed(lambda: JSONRenderer().render(data))
+    assert body == JSONRenderer().render(expected), f"{name}: fast path output differs"
+    result = {"endpoint": name, "rows": len(data), "serializer_seconds": serializer_seconds,
+              "fast_seconds": fast_seconds, "render_seconds": drf_render}
+    if orjson is not None:
+        result["orjson_render_seconds"], _ = timed(lambda: ORJSONRenderer().render(data))
+    print(f"{name:>10} {len(data):>8} {serializer_seconds:>12.4f} {fast_seconds:>10.4f} {drf_render:>10.4f} "
+          f"{result.get('orjson_render_seconds', float('nan')):>10.4f}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    harness.setup_django(os.path.join(harness.bench_dir(), f"serializers-{args.rows}.sqlite3"))
+    harness.seed_strings(args.rows)
+    harness.seed_countries(args.rows)
+
+    from api.models import String
+    from api.serializer import StringSerializer, string_row_serializer
+    from countryapi.models import Country
+    from countryapi.serializer import COUNTRY_COLUMNS, CountrySerializer, countries_to_dicts
+
+    # fresh querysets each call, so both paths include the query
+    def strings():
+        return String.objects.order_by("pk")[:args.rows]
+
+    def countries():
+        return Country.objects.order_by("pk")[:args.rows]
+
+    columns, strings_to_dicts = string_row_serializer()
+
+    print(f"{'endpoint':>10} {'rows':>8} {'serializer s':>12} {'fast s':>10} {'render s':>10} {'orjson s':>10}")
+    results = [
+        bench("strings", lambda: StringSerializer(strings(), many=True).data,
+              lambda: strings_to_dicts(strings().values(*columns))),
+        bench("countries", lambda: CountrySerializer(countries(), many=True).data,
+              lambda: countries_to_dicts(countries().values(*COUNTRY_COLUMNS))),
+    ]
+    print("results written to", harness.write_results("serializers", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+
+from decouple import config
+
+from catapi.settings import *  # noqa: F401,F403
+from benchmarks.harness import bench_dir
+
+
+if config('BENCH_DB', default='sqlite') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('BENCH_SQLITE_PATH', default=os.path.join(bench_dir(), 'bench.sqlite3')),
+        }
+    }
+
+ROOT_URLCONF = 'benchmarks.urls'
+
+# write next to the benchmark databases rather than to the tracked logs/api_logs.txt
+LOGGING = {
+    **LOGGING,
+    'handlers': {
+        **LOGGING['handlers'],
+        'file': {**LOGGING['handlers']['file'], 'filename': os.path.join(bench_dir(), 'api_logs.txt')},
+    },
+}
@@ -0,0 +1,93 @@
+"""
+String property computation: the original per-value function against api.properties.
+
+    python -m benchmarks.string_properties --sizes 1024 1048576 104857600 --batch 100000
+
+Single values are timed for ASCII and non-ASCII input at every size; the
+batch case times ``compute_batch`` inline and across a process pool.
+"""
+import argparse
+import hashlib
+import os
+import time
+from collections import Counter
+
+from benchmarks import harness
+
+
+def legacy_properties(value):
+    """The original String_Properties.stringproperities, kept as the baseline."""
+    cleaned_value = value.lower()
+    return {
+        "length": len(value),
+        "sha256_hash": hashlib.sha256(value.encode("utf-8")).hexdigest(),
+        "unique_characters": len(set(value)),
+        "is_palindrome": cleaned_value == cleaned_value[::-1],
+        "word_count": len(value.split()),
+        "character_frequency_map": dict(Counter(value)),
+    }
+
+
+def make_value(size, ascii_only=True):
+    word = "racecar level noon " if ascii_only else "ñandú café ünïcödé "
+    return (word * (size // len(word) + 1))[:size]
+
+
+def timed(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_single(sizes):
+    from api.properties import compute_properties
+
+    results = []
+    for size in sizes:
+        for ascii_only in (True, False):
+            value = make_value(size, ascii_only)
+            repeat = 1 if size >= 50 * 1024 * 1024 else 3
+            legacy, expected = timed(legacy_properties, value, repeat=repeat)
+            engine, actual = timed(compute_properties, value, repeat=repeat)
+            assert actual == expected, f"output differs for size {size}"
+            results.append({"case": "single", "size": size, "ascii": ascii_only,
+                            "legacy_seconds": legacy, "engine_seconds": engine})
+            print(f"{size:>12} {'ascii' if ascii_only else 'utf-8':>6} {legacy:>10.4f} {engine:>10.4f} "
+                  f"{legacy / engine:>7.2f}x")
+    return results
+
+
+def bench_batch(count, workers):
+    from api.properties import compute_batch, get_pool
+
+    values = [f"bench string {i} level {i % 97} racecar" for i in range(count)]
+    legacy, _ = timed(lambda: [legacy_properties(value) for value in values], repeat=1)
+    inline, _ = timed(compute_batch, values, 0, repeat=1)
+    # first call pays the pool start-up; time the warm pool
+    if workers > 1:
+        list(get_pool(workers).map(abs, range(workers * 4)))
+    pooled, _ = timed(compute_batch, values, workers, repeat=1)
+    print(f"batch of {count}: legacy {legacy:.3f}s, inline {inline:.3f}s, {workers} workers {pooled:.3f}s")
+    return [{"case": "batch", "count": count, "workers": workers, "legacy_seconds": legacy,
+             "inline_seconds": inline, "pool_seconds": pooled}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1024, 1024 * 1024, 100 * 1024 * 1024])
+    parser.add_argument("--batch", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(f"{'size':>12} {'input':>6} {'legacy s':>10} {'engine s':>10} {'speedup':>8}")
+    results = bench_single(args.sizes)
+    results += bench_batch(args.batch, args.workers)
+    print("results written to", harness.write_results("string_properties", results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Local stand-ins for the upstream APIs (``COUNTRY_URL``, ``RATE_URL``, ``CAT_URL``).
+
+    with StubUpstreams(countries=250) as upstreams:
+        env.update(upstreams.env())
+
+Serves :func:`harness.country_payload`, :data:`harness.RATES` and a fixed cat
+fact from a threaded HTTP server on a free local port, with ETags so
+conditional refreshes get 304s. ``delay`` seconds are added to every answer.
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import harness
+
+
+class StubUpstreams:
+    def __init__(self, countries=250, seed=0, delay=0.0):
+        self.delay = delay
+        self.bodies = {
+            "/countries": json.dumps(harness.country_payload(countries, seed)).encode(),
+            "/rates": json.dumps({"result": "success", "base_code": "USD", "rates": harness.RATES}).encode(),
+            "/fact": json.dumps({"fact": "cats sleep for 70% of their lives", "length": 33}).encode(),
+        }
+        self.etags = {path: '"' + hashlib.sha256(body).hexdigest()[:16] + '"' for path, body in self.bodies.items()}
+        self.hits = {path: 0 for path in self.bodies}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def _handler(self):
+        stubs = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                body = stubs.bodies.get(path)
+                if stubs.delay:
+                    time.sleep(stubs.delay)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                stubs.hits[path] += 1
+                etag = stubs.etags[path]
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @property
+    def urls(self):
+        return {name: self.base_url + path for name, path in
+                (("countries", "/countries"), ("rates", "/rates"), ("fact", "/fact"))}
+
+    def env(self):
+        """Environment variables pointing the app at the stubs."""
+        urls = self.urls
+        return {"COUNTRY_URL": urls["countries"], "RATE_URL": urls["rates"], "Api_url": urls["fact"]}
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
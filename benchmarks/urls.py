@@ -0,0 +1,8 @@
+from django.urls import include, path
+
+
+# the string/profile API is not routed by catapi.urls; benchmarks serve both
+urlpatterns = [
+    path("", include("api.urls")),
+    path("api/", include("countryapi.urls")),
+]
@@ -0,0 +1,45 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+
+def _generation_key(namespace):
+    return f"{namespace}:generation"
+
+
+def get_generation(namespace):
+    """
+    Return the current data generation for ``namespace``.
+
+    Cache keys built from the generation go stale together when it is bumped.
+    A missing counter is seeded from the clock rather than 1, so an evicted
+    counter can never come back to a value older entries were stored under.
+    """
+    key = _generation_key(namespace)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(namespace):
+    """Invalidate every cache entry keyed on ``namespace``'s generation."""
+    key = _generation_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+        return cache.get(key)
+
+
+def make_key(namespace, *parts):
+    """Build a cache key from the namespace generation and arbitrary key parts."""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f"{namespace}:{get_generation(namespace)}:{digest}"
+
+
+def make_etag(body):
+    """Strong ETag for a rendered response body."""
+    return '"%s"' % hashlib.sha256(body).hexdigest()[:32]
@@ -0,0 +1,70 @@
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+# fields whose to_representation returns database values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.JSONField,
+)
+
+
+def datetime_converter(field):
+    """
+    ``DateTimeField.to_representation`` for aware ISO 8601 output, with the
+    field's time zone resolved once instead of once per row.
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+def field_converter(field):
+    """Per-value conversion for ``field``, or None when the value passes through unchanged."""
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return None
+    if isinstance(field, serializers.DateTimeField):
+        return datetime_converter(field)
+    return field.to_representation
+
+
+def compile_row_serializer(serializer_class):
+    """
+    Build a read-only fast path for a flat ``ModelSerializer``.
+
+    Returns ``(columns, to_dicts)``: pass ``columns`` to ``.values()`` and
+    ``to_dicts(rows)`` returns the same list of dicts the serializer would
+    produce with ``many=True``. Fields are resolved once, here; per call only
+    the conversions that change values (decimals, datetimes, ...) are set up.
+    """
+    fields = []
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        if field.source != name or isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+            raise ValueError(f"{serializer_class.__name__}.{name} is not a plain model column")
+        fields.append((name, field))
+
+    def to_dicts(rows):
+        converters = [(name, field_converter(field)) for name, field in fields]
+        data = []
+        for row in rows:
+            item = {}
+            for name, convert in converters:
+                value = row[name]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
+
+    return tuple(name for name, _ in fields), to_dicts
@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .metrics import record_outbound
+
+
+logger = logging.getLogger(__name__)
+
+# connections kept alive per upstream host; sized for the concurrent refresh fetches
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+
+# upstream statuses worth another attempt; anything else is returned as is
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+_session = None
+_session_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+# exceptions meaning "the upstream call failed", from either client
+UPSTREAM_ERRORS = (requests.exceptions.RequestException, httpx.HTTPError)
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    """Raised instead of calling a host whose circuit breaker is open."""
+
+
+def build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """Return the process-wide pooled keep-alive session shared by outbound calls."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def get_async_client():
+    """
+    Return the pooled ``httpx.AsyncClient`` for the running event loop.
+
+    httpx clients cannot be shared across event loops, so there is one per
+    loop. Under ASGI that is one for the whole process.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=POOL_MAXSIZE)
+        client = _async_clients[loop] = httpx.AsyncClient(limits=limits)
+    return client
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one upstream host.
+
+    After ``failure_threshold`` failed calls in a row the circuit opens and
+    calls fail fast for ``reset_timeout`` seconds. Then a single trial call
+    is let through (half-open): success closes the circuit, failure opens it
+    again.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_in_flight or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def get_breaker(url):
+    """Return the shared circuit breaker for ``url``'s host."""
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(
+                settings.HTTP_CIRCUIT_FAILURE_THRESHOLD, settings.HTTP_CIRCUIT_RESET_TIMEOUT
+            )
+        return breaker
+
+
+def reset_breakers():
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def backoff_delay(attempt, base):
+    """Full-jitter exponential backoff: uniform in [0, base * 2**attempt]."""
+    return random.uniform(0, base * (2 ** attempt))
+
+
+def request(method, url, session=None, retries=None, backoff=None, **kwargs):
+    """
+    Send a request over the pooled session with bounded retries and a per-host circuit breaker.
+
+    Connection errors, timeouts and ``RETRY_STATUSES`` are retried up to
+    ``retries`` times (``HTTP_RETRIES``) with jittered backoff. The final
+    response is returned as is (callers still ``raise_for_status()``); the
+    final exception is re-raised. Other 5xx responses are returned at once
+    but count as failures for the breaker. ``CircuitOpen`` is raised without
+    contacting the host while its breaker is open.
+    """
+    session = session or get_session()
+    retries = settings.HTTP_RETRIES if retries is None else retries
+    backoff = settings.HTTP_RETRY_BACKOFF if backoff is None else backoff
+    breaker = get_breaker(url)
+
+    if not breaker.allow():
+        raise CircuitOpen(f"circuit open for {urlsplit(url).netloc}")
+
+    try:
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                record_outbound(url, time.perf_counter() - start)
+                if attempt == retries:
+                    raise
+                logger.warning("%s %s failed (%s), retrying", method, url, e)
+            else:
+                record_outbound(url, time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUSES:
+                    # other 5xx are not retried (the request may have had effects) but still count against the host
+                    if response.status_code >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    return response
+                if attempt == retries:
+                    breaker.record_failure()
+                    return response
+                logger.warning("%s %s answered %s, retrying", method, url, response.status_code)
+            time.sleep(backoff_delay(attempt, backoff))
+    except BaseException:
+        # whatever escapes (the last retried error, any other error, cancellation)
+        # counts as a failure, which also ends a half-open trial call
+        breaker.record_failure()
+        raise
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+async def arequest(method, url, client=None, retries=None, backoff=None, **kwargs):
+    """
+    Async twin of :func:`request` over ``httpx``: same retries, backoff and breakers.
+
+    Raises ``httpx`` exceptions (or ``CircuitOpen``); see ``UPSTREAM_ERRORS``.
+    """
+    client = client or get_async_client()
+    retries = settings.HTTP_RETRIES if retries is None else retries
+    backoff = settings.HTTP_RETRY_BACKOFF if backoff is None else backoff
+    breaker = get_breaker(url)
+
+    if not breaker.allow():
+        raise CircuitOpen(f"circuit open for {urlsplit(url).netloc}")
+
+    try:
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                record_outbound(url, time.perf_counter() - start)
+                if attempt == retries:
+                    raise
+                logger.warning("%s %s failed (%r), retrying", method, url, e)
+            else:
+                record_outbound(url, time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUSES:
+                    # other 5xx are not retried (the request may have had effects) but still count against the host
+                    if response.status_code >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    return response
+                if attempt == retries:
+                    breaker.record_failure()
+                    return response
+                logger.warning("%s %s answered %s, retrying", method, url, response.status_code)
+            await asyncio.sleep(backoff_delay(attempt, backoff))
+    except BaseException:
+        # whatever escapes (the last retried error, any other error, cancellation)
+        # counts as a failure, which also ends a half-open trial call
+        breaker.record_failure()
+        raise
+
+
+async def aget(url, **kwargs):
+    return await arequest("GET", url, **kwargs)
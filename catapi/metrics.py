@@ -0,0 +1,262 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# SQL statements kept per request for the slow-request log
+SLOW_LOG_MAX_QUERIES = 50
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Prometheus-style histogram; counts are per bucket and made cumulative when exported."""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    """What one request spent on the database and on outbound HTTP calls."""
+    __slots__ = ("db_queries", "db_seconds", "http_calls", "http_seconds", "sql")
+
+    def __init__(self, capture_sql):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.http_calls = 0
+        self.http_seconds = 0.0
+        self.sql = [] if capture_sql else None
+
+
+_current = ContextVar("catapi_request_stats", default=None)
+
+
+class RouteSeries:
+    """Every series for one (route, method), updated together under the registry lock."""
+    __slots__ = ("statuses", "latency", "response_size", "db_queries", "db_seconds", "http_calls", "http_seconds")
+
+    def __init__(self):
+        self.statuses = {}
+        self.latency = Histogram(DURATION_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.http_calls = 0
+        self.http_seconds = 0.0
+
+
+class Registry:
+    """In-process metrics, one set per worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}      # (route, method) -> RouteSeries
+            self.outbound = {}    # host -> Histogram
+
+    def observe_request(self, route, method, status, seconds, size, stats):
+        with self._lock:
+            series = self.routes.get((route, method))
+            if series is None:
+                series = self.routes[(route, method)] = RouteSeries()
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+            series.latency.observe(seconds)
+            if size is not None:
+                series.response_size.observe(size)
+            series.db_queries += stats.db_queries
+            series.db_seconds += stats.db_seconds
+            series.http_calls += stats.http_calls
+            series.http_seconds += stats.http_seconds
+
+    def observe_outbound(self, host, seconds):
+        with self._lock:
+            histogram = self.outbound.get(host)
+            if histogram is None:
+                histogram = self.outbound[host] = Histogram(DURATION_BUCKETS)
+            histogram.observe(seconds)
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            routes = sorted(((("route", route), ("method", method)), series)
+                            for (route, method), series in self.routes.items())
+            lines = []
+            _counter(lines, "catapi_http_requests_total", "HTTP requests handled.",
+                     [(labels + (("status", str(status)),), count)
+                      for labels, series in routes for status, count in sorted(series.statuses.items())])
+            _histograms(lines, "catapi_http_request_duration_seconds", "Request latency.",
+                        [(labels, series.latency) for labels, series in routes])
+            _histograms(lines, "catapi_http_response_size_bytes", "Response body size.",
+                        [(labels, series.response_size) for labels, series in routes])
+            _counter(lines, "catapi_db_queries_total", "Database queries run while handling requests.",
+                     [(labels, series.db_queries) for labels, series in routes])
+            _counter(lines, "catapi_db_query_seconds_total", "Time spent in database queries.",
+                     [(labels, series.db_seconds) for labels, series in routes])
+            _counter(lines, "catapi_outbound_http_requests_total", "Outbound HTTP calls made while handling requests.",
+                     [(labels, series.http_calls) for labels, series in routes])
+            _counter(lines, "catapi_outbound_http_seconds_total", "Time spent in outbound HTTP calls while handling requests.",
+                     [(labels, series.http_seconds) for labels, series in routes])
+            _histograms(lines, "catapi_outbound_http_duration_seconds", "Outbound HTTP call latency, per host.",
+                        [((("host", host),), histogram) for host, histogram in sorted(self.outbound.items())])
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(pairs):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _counter(lines, name, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {value}")
+
+
+def _histograms(lines, name, help_text, histograms):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in histograms:
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+
+registry = Registry()
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - start
+        if stats.sql is not None and len(stats.sql) < SLOW_LOG_MAX_QUERIES:
+            stats.sql.append(sql)
+
+
+def _install_db_wrapper(connection, **kwargs):
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+def record_outbound(url, seconds):
+    """Record an outbound HTTP call (made by ``catapi.http_client``) against its host and the current request."""
+    if not settings.METRICS_ENABLED:
+        return
+    registry.observe_outbound(urlsplit(url).netloc, seconds)
+    stats = _current.get()
+    if stats is not None:
+        stats.http_calls += 1
+        stats.http_seconds += seconds
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status, response size, DB query count/time and outbound
+    HTTP time per route into :data:`registry`, served by :func:`metrics_view`.
+
+    Disabled (removed from the stack) unless ``METRICS_ENABLED``. Requests
+    slower than ``METRICS_SLOW_REQUEST_MS`` are logged with their SQL.
+    Queries are counted by a wrapper installed on every database
+    connection, which finds the current request through a context variable,
+    so queries run under ``sync_to_async`` by async views are counted too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_seconds = settings.METRICS_SLOW_REQUEST_MS / 1000
+        connection_created.connect(_install_db_wrapper)
+        for connection in connections.all(initialized_only=True):
+            _install_db_wrapper(connection)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = RequestStats(capture_sql=self.slow_seconds > 0)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats(capture_sql=self.slow_seconds > 0)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    def _record(self, request, response, seconds, stats):
+        match = request.resolver_match
+        route = match.route if match is not None else "unmatched"
+        if not response.streaming:
+            size = len(response.content)
+        else:
+            # FileResponse sets it from the file; other streams have no size up front
+            size = response.get("Content-Length")
+            if size is not None:
+                size = int(size)
+        registry.observe_request(route, request.method, response.status_code, seconds, size, stats)
+
+        if self.slow_seconds and seconds >= self.slow_seconds:
+            logger.warning(
+                "slow request %s %s (%s) took %.1f ms: %d queries in %.1f ms, %d outbound calls in %.1f ms; sql: %s",
+                request.method, request.path, route, seconds * 1000, stats.db_queries, stats.db_seconds * 1000,
+                stats.http_calls, stats.http_seconds * 1000, stats.sql,
+            )
+
+
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
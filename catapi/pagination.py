@@ -0,0 +1,154 @@
+import base64
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.utils.urls import replace_query_param
+
+
+CURSOR_PARAM = "cursor"
+PAGE_SIZE_PARAM = "page_size"
+PAGINATE_PARAM = "paginate"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def wants_pagination(request):
+    """Paginate unless the client explicitly opts into the legacy ``?paginate=false`` shape."""
+    return request.query_params.get(PAGINATE_PARAM, "true").lower() != "false"
+
+
+def _row_pk(row):
+    return row["id"] if isinstance(row, dict) else row.pk
+
+
+def _row_value(row, field):
+    if field == "pk":
+        return _row_pk(row)
+    return row[field] if isinstance(row, dict) else getattr(row, field)
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) pagination over ``field`` with the primary key as tie-breaker.
+
+    Each page is a ``WHERE (field, pk) > (last_field, last_pk)`` seek rather
+    than an OFFSET, so deep pages cost the same as the first one. NULLs sort
+    as the smallest value (MySQL's native order), and cursors are opaque
+    base64 tokens carrying the boundary row and the paging direction.
+    """
+
+    def __init__(self, field="pk", descending=False, page_size=None):
+        self.field = field
+        self.descending = descending
+        self.page_size = page_size or settings.PAGE_SIZE
+
+    @classmethod
+    def from_request(cls, request, field="pk", descending=False):
+        page_size = request.query_params.get(PAGE_SIZE_PARAM)
+        try:
+            page_size = int(page_size) if page_size is not None else settings.PAGE_SIZE
+        except ValueError:
+            raise InvalidCursor("page_size must be an integer")
+        page_size = max(1, min(page_size, settings.MAX_PAGE_SIZE))
+        return cls(field, descending, page_size)
+
+    def encode_cursor(self, row, backwards=False):
+        position = {"v": _row_value(row, self.field), "pk": _row_pk(row)}
+        if backwards:
+            position["b"] = 1
+        data = json.dumps(position, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, cursor, model):
+        """
+        Return ``(value, pk, backwards)`` from ``cursor``, with ``value`` converted
+        by ``model``'s sort field. Raises ``InvalidCursor`` for anything that is
+        not a cursor this paginator could have issued.
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            value, pk = position["v"], position["pk"]
+        except (ValueError, KeyError, TypeError):
+            raise InvalidCursor("Invalid cursor")
+
+        if type(pk) is not int or not (value is None or type(value) in (str, int, float)):
+            raise InvalidCursor("Invalid cursor")
+        field = model._meta.pk if self.field == "pk" else model._meta.get_field(self.field)
+        try:
+            value = field.to_python(value)
+        except ValidationError:
+            raise InvalidCursor("Invalid cursor")
+        return value, pk, bool(position.get("b"))
+
+    def _ordering(self, descending):
+        if self.field == "pk":
+            return ["-pk" if descending else "pk"]
+        if descending:
+            return [F(self.field).desc(nulls_last=True), "-pk"]
+        return [F(self.field).asc(nulls_first=True), "pk"]
+
+    def _seek(self, value, pk, descending):
+        """Rows strictly after ``(value, pk)`` when walking in the given direction."""
+        if self.field == "pk":
+            return Q(pk__lt=pk) if descending else Q(pk__gt=pk)
+        if descending:
+            if value is None:
+                return Q(**{f"{self.field}__isnull": True, "pk__lt": pk})
+            return (
+                Q(**{f"{self.field}__lt": value})
+                | Q(**{self.field: value, "pk__lt": pk})
+                | Q(**{f"{self.field}__isnull": True})
+            )
+        if value is None:
+            return Q(**{f"{self.field}__isnull": True, "pk__gt": pk}) | Q(**{f"{self.field}__isnull": False})
+        return Q(**{f"{self.field}__gt": value}) | Q(**{self.field: value, "pk__gt": pk})
+
+    def paginate(self, queryset, cursor=None):
+        """
+        Return ``(rows, next_cursor, previous_cursor)`` for the page at ``cursor``.
+
+        Works on model querysets and ``.values()`` querysets that include ``id``.
+        """
+        backwards = False
+        if cursor:
+            value, pk, backwards = self.decode_cursor(cursor, queryset.model)
+            walk_descending = self.descending != backwards
+            queryset = queryset.filter(self._seek(value, pk, walk_descending))
+        else:
+            walk_descending = self.descending
+
+        rows = list(queryset.order_by(*self._ordering(walk_descending))[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+
+        if backwards:
+            rows.reverse()
+            next_cursor = self.encode_cursor(rows[-1]) if rows else None
+            previous_cursor = self.encode_cursor(rows[0], backwards=True) if has_more else None
+        else:
+            next_cursor = self.encode_cursor(rows[-1]) if has_more else None
+            previous_cursor = self.encode_cursor(rows[0], backwards=True) if cursor and rows else None
+        return rows, next_cursor, previous_cursor
+
+
+def page_link(request, cursor, params=None):
+    """
+    Relative link to the page at ``cursor``; relative so cached bodies stay host-independent.
+
+    With ``params`` (name -> value, ``None`` values left out) the link keeps
+    only those query parameters instead of the request's whole query string,
+    so a body cached under a key built from them links the same for everyone.
+    """
+    if cursor is None:
+        return None
+    if params is None:
+        return replace_query_param(request.get_full_path(), CURSOR_PARAM, cursor)
+    query = {name: value for name, value in params.items() if value is not None}
+    query[CURSOR_PARAM] = cursor
+    return f"{request.path}?{urlencode(query)}"
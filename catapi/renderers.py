@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson, producing the same JSON as DRF's compact
+    JSONRenderer. Types orjson would format differently (datetimes, decimals)
+    are handed to DRF's encoder. The bytes can still differ in float
+    exponents (orjson writes ``1e16`` where json writes ``1e+16``). Data orjson
+    cannot encode, such as integers wider than 64 bits, and any render when
+    orjson is not installed, goes through JSONRenderer.
+    """
+    OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.OPTIONS)
+        except TypeError:  # orjson.JSONEncodeError, e.g. an int past 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes these so the output is also valid JavaScript
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+def json_renderer():
+    """The renderer used for pre-rendered JSON bodies, per ``USE_ORJSON``."""
+    return ORJSONRenderer() if settings.USE_ORJSON else JSONRenderer()
+
+
+def json_response(data, status=200):
+    """A plain Django JSON response rendered like DRF's, for views that are not APIViews (async views)."""
+    return HttpResponse(json_renderer().render(data), content_type="application/json", status=status)
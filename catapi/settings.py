@@ -59,6 +59,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'catapi.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -106,6 +107,92 @@ DATABASES = {
     }
 }
 
+# Cache
+# locmem is per process; set REDIS_URL so every worker shares cached responses
+# and sees invalidations from the process that ran the refresh.
+
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# seconds a rendered /api/countries/ response stays cached (refresh and delete invalidate it early)
+COUNTRY_LIST_CACHE_TIMEOUT = config('COUNTRY_LIST_CACHE_TIMEOUT', default=300, cast=int)
+
+
+# keyset pagination for list endpoints; ?page_size= is capped at MAX_PAGE_SIZE
+PAGE_SIZE = config('PAGE_SIZE', default=50, cast=int)
+MAX_PAGE_SIZE = config('MAX_PAGE_SIZE', default=500, cast=int)
+
+
+# rows fetched per query by the streaming /export endpoints
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+
+# strings analyzed, deduplicated and inserted together by POST /strings/batch
+STRING_BATCH_CHUNK_SIZE = config('STRING_BATCH_CHUNK_SIZE', default=1000, cast=int)
+
+# worker processes used to compute string properties for large batches (0 = inline)
+STRING_PROPERTIES_WORKERS = config('STRING_PROPERTIES_WORKERS', default=0, cast=int)
+
+# how new strings store character_frequency_map: "json" or "packed" (zlib-compressed codepoint/count pairs)
+STRING_FREQUENCY_ENCODING = config('STRING_FREQUENCY_ENCODING', default='json')
+
+# outbound HTTP (catapi.http_client): retries with jittered backoff, then a per-host circuit breaker
+HTTP_RETRIES = config('HTTP_RETRIES', default=2, cast=int)
+HTTP_RETRY_BACKOFF = config('HTTP_RETRY_BACKOFF', default=0.2, cast=float)
+HTTP_CIRCUIT_FAILURE_THRESHOLD = config('HTTP_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+HTTP_CIRCUIT_RESET_TIMEOUT = config('HTTP_CIRCUIT_RESET_TIMEOUT', default=30, cast=float)
+
+# route /me and the country refresh to their native async views; for ASGI servers (uvicorn)
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# /me cat facts: served fresh for CAT_FACT_TTL seconds, then stale (while refreshing) up to CAT_FACT_MAX_STALE
+CAT_FACT_TTL = config('CAT_FACT_TTL', default=60, cast=float)
+CAT_FACT_MAX_STALE = config('CAT_FACT_MAX_STALE', default=3600, cast=float)
+CAT_FACT_CACHE_SIZE = config('CAT_FACT_CACHE_SIZE', default=10, cast=int)
+
+# seconds a natural-language query's matching ids stay cached (also invalidated on writes)
+NLQ_RESULT_CACHE_TIMEOUT = config('NLQ_RESULT_CACHE_TIMEOUT', default=300, cast=int)
+
+# where the summary image is written; redrawn only when its inputs change
+SUMMARY_IMAGE_DIR = config('SUMMARY_IMAGE_DIR', default=str(BASE_DIR / 'cache'))
+
+# hand image bodies to the front-end server: "X-Accel-Redirect" (nginx, pointing at
+# SENDFILE_URL_PREFIX, an internal location aliased to SUMMARY_IMAGE_DIR) or "X-Sendfile"
+SENDFILE_HEADER = config('SENDFILE_HEADER', default='')
+SENDFILE_URL_PREFIX = config('SENDFILE_URL_PREFIX', default='/protected/cache/')
+
+# disk budget for resized/re-encoded summary images under SUMMARY_IMAGE_DIR/variants (LRU eviction)
+IMAGE_VARIANT_CACHE_BYTES = config('IMAGE_VARIANT_CACHE_BYTES', default=20 * 1024 * 1024, cast=int)
+
+# per-route latency, DB query and outbound HTTP metrics served at /metrics (Prometheus text format)
+METRICS_ENABLED = config('METRICS_ENABLED', default=False, cast=bool)
+# log requests slower than this many milliseconds, with their SQL, to the catapi.metrics logger (0 = off)
+METRICS_SLOW_REQUEST_MS = config('METRICS_SLOW_REQUEST_MS', default=0, cast=float)
+
+# render JSON with orjson (optional dependency; same bytes as DRF's renderer, less CPU)
+USE_ORJSON = config('USE_ORJSON', default=False, cast=bool)
+if USE_ORJSON:
+    REST_FRAMEWORK = {
+        'DEFAULT_RENDERER_CLASSES': [
+            'catapi.renderers.ORJSONRenderer',
+            'rest_framework.renderers.BrowsableAPIRenderer',
+        ],
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -147,6 +234,20 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# level for the project's loggers (api, countryapi, catapi); records go through a queue to a
+# background thread that writes them to logs/api_logs.txt, as JSON lines unless LOG_FORMAT=verbose.
+# The default keeps the file to errors, as before
+LOG_LEVEL = config('LOG_LEVEL', default='ERROR')
+LOG_FORMAT = config('LOG_FORMAT', default='json')
+# records a second each logger may emit below WARNING (0 = unlimited); LOG_RATE_LIMITS overrides
+# it per logger, e.g. "countryapi.refresh=5,api.views=50"
+LOG_RATE_LIMIT = config('LOG_RATE_LIMIT', default=0, cast=float)
+LOG_RATE_BURST = config('LOG_RATE_BURST', default=0, cast=int)
+LOG_RATE_LIMITS = config(
+    'LOG_RATE_LIMITS', default='',
+    cast=lambda value: dict(item.strip().split('=', 1) for item in value.split(',') if item.strip()),
+)
+
 LOGGING = {
     'version' : 1,
     'disable_existing_loggers': False,
@@ -155,22 +256,60 @@ LOGGING = {
             'format' : '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
             'style' : "{",
         },
+        'json' : {
+            '()' : 'catapi.structured_logging.JSONFormatter',
+        },
+    },
+    'filters' : {
+        'rate_limit' : {
+            '()' : 'catapi.structured_logging.RateLimitFilter',
+            'rate' : LOG_RATE_LIMIT,
+            'burst' : LOG_RATE_BURST or None,
+            'rates' : LOG_RATE_LIMITS,
+        },
     },
     'handlers' : {
         'file' : {
-            'level' : 'ERROR',
             'class' : 'logging.FileHandler',
             'filename' : str(LOGS_DIR / 'api_logs.txt'), 
-            'formatter' : 'verbose',
+            'formatter' : LOG_FORMAT,
+        },
+        # handlers are created in name order, so 'queue' finds 'file' already built
+        'queue' : {
+            '()' : 'catapi.structured_logging.QueueListenerHandler',
+            'handlers' : ['cfg://handlers.file'],
+            'filters' : ['rate_limit'],
         },
     },
     'loggers' : {
         'api' : {
-            'handlers' : ['file'],
-            'level' : 'ERROR',
+            'handlers' : ['queue'],
+            'level' : LOG_LEVEL,
+            'propagate' : False,
+        },
+        'countryapi' : {
+            'handlers' : ['queue'],
+            'level' : LOG_LEVEL,
+            'propagate' : False,
+        },
+        'catapi' : {
+            'handlers' : ['queue'],
+            'level' : LOG_LEVEL,
             'propagate' : False,
         },
     }
 }
 
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# number of rows per bulk_create/bulk_update statement during a country refresh
+REFRESH_CHUNK_SIZE = config('REFRESH_CHUNK_SIZE', default=500, cast=int)
+
+# run POST /api/countries/refresh on a background thread (202 + job id) unless ?async=false
+REFRESH_ASYNC = config('REFRESH_ASYNC', default=False, cast=bool)
+
+# an active refresh job that has not reported progress for this long no longer holds the lock
+REFRESH_JOB_STALE_SECONDS = config('REFRESH_JOB_STALE_SECONDS', default=600, cast=int)
+
+# seeds each country's fixed GDP multiplier; changing it changes every estimated_gdp on the next refresh
+GDP_MULTIPLIER_SEED = config('GDP_MULTIPLIER_SEED', default='catapi')
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+
+EXPORT_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def iterate_in_batches(queryset, chunk_size=None):
+    """
+    Yield every row of ``queryset`` in primary-key order, ``chunk_size`` rows per query.
+
+    Each batch seeks past the last primary key seen rather than using
+    ``.iterator()``: MySQLdb buffers a whole result set client-side, so only
+    bounded queries keep memory flat on MySQL.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    queryset = queryset.order_by("pk")
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        batch = list(batch[:chunk_size])
+        if not batch:
+            return
+        yield from batch
+        last_pk = batch[-1].pk
+
+
+def encode_rows(rows, to_representation, export_format):
+    """Encode rows one at a time as a JSON array or NDJSON lines."""
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    if export_format == "ndjson":
+        for row in rows:
+            yield (encoder.encode(to_representation(row)) + "\n").encode("utf-8")
+        return
+
+    yield b"["
+    separator = ""
+    for row in rows:
+        yield (separator + encoder.encode(to_representation(row))).encode("utf-8")
+        separator = ","
+    yield b"]"
+
+
+def export_response(queryset, serializer_class, export_format, filename):
+    """
+    Stream ``queryset`` as JSON or NDJSON with memory independent of the row count.
+
+    One serializer instance is reused for every row, so only the current
+    batch of model instances is ever held in memory.
+    """
+    serializer = serializer_class()
+    response = StreamingHttpResponse(
+        encode_rows(iterate_in_batches(queryset), serializer.to_representation, export_format),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,167 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+from logging.handlers import QueueHandler, QueueListener
+
+
+# attributes every LogRecord has; anything else was passed through ``extra=`` and is written out
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# message arguments of these types cannot change after the call, so formatting can wait for the listener
+_IMMUTABLE_ARGS = frozenset({str, int, float, bool, type(None), bytes, Decimal, UUID, date, datetime})
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, source, and any ``extra=`` fields."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "thread": record.thread,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per logger name: at most ``rate`` records a second (bursts of ``burst``).
+
+    ``rates`` overrides the rate for individual loggers (``{"countryapi.refresh": 5}``);
+    a rate of 0 means unlimited. Only records below ``max_level`` (WARNING by
+    default) are limited. The first record let through after some were
+    dropped carries ``suppressed``, the number dropped in between.
+    """
+
+    def __init__(self, rate=0, burst=None, rates=None, max_level=logging.WARNING):
+        super().__init__()
+        self.rate = float(rate)
+        self.burst = burst
+        self.rates = {name: float(value) for name, value in (rates or {}).items()}
+        self.max_level = logging._checkLevel(max_level)
+        self._buckets = {}   # logger name -> [tokens, last refill, suppressed]
+        self._lock = threading.Lock()
+
+    def rate_for(self, name):
+        return self.rates.get(name, self.rate)
+
+    def filter(self, record):
+        if record.levelno >= self.max_level:
+            return True
+        rate = self.rate_for(record.name)
+        if not rate:
+            return True
+        burst = self.burst or rate
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = [burst, now, 0]
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                return False
+            bucket[0] = tokens - 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    Hands records to a background ``QueueListener`` that formats and writes them to ``handlers``.
+
+    The logging thread only merges the message arguments and enqueues; JSON
+    formatting and file writes happen on the listener thread. ``handlers``
+    are already-configured handlers, referenced from ``LOGGING`` as
+    ``cfg://handlers.<name>`` (``dictConfig`` creates handlers in name
+    order, so their names must sort before this one's). When the queue
+    holds ``queue_size`` records, new ones are dropped and counted in
+    ``dropped`` rather than blocking the request. The listener is restarted
+    in a forked child and stopped (flushing the queue) at exit.
+    """
+
+    def __init__(self, handlers, queue_size=10000, respect_handler_level=True):
+        super().__init__(queue.SimpleQueue())
+        self.listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        # index rather than iterate: dictConfig resolves cfg:// references in __getitem__
+        self.handlers = [handlers[i] for i in range(len(handlers))]
+        for handler in self.handlers:
+            if not isinstance(handler, logging.Handler):
+                raise ValueError(f"{handler!r} is not a configured handler; reference it as cfg://handlers.<name>")
+        self.queue_size = queue_size
+        self.respect_handler_level = respect_handler_level
+        self.dropped = 0
+        self.start()
+        atexit.register(self.stop)
+
+    def start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # forked: the parent's listener thread (and anything it had queued) stayed behind
+                self.queue = queue.SimpleQueue()
+            self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=self.respect_handler_level)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        with self._start_lock:
+            if self.listener is not None and self._pid == os.getpid():
+                self.listener.stop()
+            self.listener = None
+            self._pid = None
+
+    def prepare(self, record):
+        # QueueHandler.prepare formats the whole record here. Records with only
+        # immutable arguments go as they are; otherwise merge the arguments (they
+        # may change after the call) into a copy, and render any traceback now
+        args = record.args
+        if not record.exc_info and (not args or (type(args) is tuple and all(type(arg) in _IMMUTABLE_ARGS for arg in args))):
+            return record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self.start()
+        # SimpleQueue is unbounded (and cheaper than Queue); the size check is approximate
+        if self.queue.qsize() >= self.queue_size:
+            self.dropped += 1
+        else:
+            self.queue.put_nowait(record)
+
+    def close(self):
+        self.stop()
+        super().close()
@@ -0,0 +1,141 @@
+import logging
+import os
+import time
+
+from django.conf import settings
+from PIL import Image, features
+
+from . import summary_image
+
+
+logger = logging.getLogger(__name__)
+
+
+VARIANTS_DIRNAME = 'variants'
+
+# ?w= is rounded up to one of these so the cache holds a handful of files per format
+WIDTH_BUCKETS = (200, 400, 600, summary_image.IMAGE_WIDTH)
+
+# server preference, best compression first; PNG is the fallback for clients that ask for nothing specific
+FORMATS = [
+    ("avif", "image/avif", {"quality": 60}),
+    ("webp", "image/webp", {"quality": 80, "method": 4}),
+    ("png", "image/png", {"optimize": True}),
+]
+FORMATS = [f for f in FORMATS if f[0] == "png" or features.check(f[0])]
+CONTENT_TYPES = {fmt: content_type for fmt, content_type, _ in FORMATS}
+
+
+class InvalidWidth(ValueError):
+    pass
+
+
+def variants_dir():
+    return os.path.join(summary_image.cache_dir(), VARIANTS_DIRNAME)
+
+
+def width_bucket(raw):
+    """Round a ``?w=`` value up to the nearest ``WIDTH_BUCKETS`` entry (None means full size)."""
+    if raw is None or raw == "":
+        return summary_image.IMAGE_WIDTH
+    try:
+        width = int(raw)
+    except ValueError:
+        raise InvalidWidth("w must be a positive integer")
+    if width <= 0:
+        raise InvalidWidth("w must be a positive integer")
+    for bucket in WIDTH_BUCKETS:
+        if width <= bucket:
+            return bucket
+    return WIDTH_BUCKETS[-1]
+
+
+def _accepted_types(accept):
+    """``{media_type: q}`` for the explicit types in an Accept header."""
+    accepted = {}
+    for item in accept.split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[media_type.lower()] = q
+    return accepted
+
+
+def negotiate_format(accept):
+    """
+    Pick the best format the client explicitly accepts, by server preference.
+
+    Only exact types count (``image/webp``, not ``image/*``): wildcard-only
+    clients such as curl keep getting PNG.
+    """
+    accepted = _accepted_types(accept or "")
+    for fmt, content_type, _ in FORMATS:
+        if accepted.get(content_type, 0) > 0:
+            return fmt
+    return "png"
+
+
+def _touch(path):
+    """Mark a cached variant as used without changing its mtime (which feeds its ETag)."""
+    try:
+        os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+    except OSError:
+        pass
+
+
+def prune_variants(max_bytes=None, keep=None):
+    """Delete least recently used variants (never ``keep``) until the directory is under ``max_bytes``."""
+    max_bytes = settings.IMAGE_VARIANT_CACHE_BYTES if max_bytes is None else max_bytes
+    entries = []
+    with os.scandir(variants_dir()) as it:
+        for entry in it:
+            if entry.is_file() and not entry.name.startswith("."):
+                stat = entry.stat()
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.unlink(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+    return total
+
+
+def variant_path(width, fmt):
+    """
+    Path of the summary image at ``width`` in ``fmt``, encoding it on first use.
+
+    Variants are named after the source image's mtime and size, so a redrawn
+    summary never serves old variants; those age out of the LRU. Raises
+    ``FileNotFoundError`` when there is no summary image yet.
+    """
+    source = summary_image.image_path()
+    if width == summary_image.IMAGE_WIDTH and fmt == "png":
+        return source
+
+    stat = os.stat(source)
+    name = f"summary-{stat.st_mtime_ns:x}-{stat.st_size:x}-{width}.{fmt}"
+    path = os.path.join(variants_dir(), name)
+    if os.path.exists(path):
+        _touch(path)
+        return path
+
+    os.makedirs(variants_dir(), exist_ok=True)
+    options = next(options for f, _, options in FORMATS if f == fmt)
+    with Image.open(source) as image:
+        if width < image.width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        summary_image.atomic_write(path, lambda f: image.save(f, format=fmt.upper(), **options))
+    logger.info("encoded summary image variant %s", name)
+    prune_variants(keep=path)
+    return path
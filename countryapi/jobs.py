@@ -0,0 +1,125 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import RefreshJob
+from .refresh import arun_refresh, run_refresh
+
+
+logger = logging.getLogger(__name__)
+
+
+def _release_stale_job():
+    """Fail an active job whose worker stopped reporting, so the lock frees up."""
+    cutoff = timezone.now() - timedelta(seconds=settings.REFRESH_JOB_STALE_SECONDS)
+    released = RefreshJob.objects.filter(lock=RefreshJob.ACTIVE_LOCK, updated_at__lt=cutoff).update(
+        lock=None,
+        status=RefreshJob.STATUS_FAILED,
+        error="refresh worker stopped reporting progress",
+        finished_at=timezone.now(),
+    )
+    if released:
+        logger.warning("released stale refresh job lock")
+    return released
+
+
+def acquire_refresh_job():
+    """
+    Create a queued job holding the refresh lock.
+
+    Returns ``(job, None)`` on success or ``(None, active_job)`` when another
+    refresh is already queued or running.
+    """
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return RefreshJob.objects.create(lock=RefreshJob.ACTIVE_LOCK), None
+        except IntegrityError:
+            if not _release_stale_job():
+                break
+
+    active_job = RefreshJob.objects.filter(lock=RefreshJob.ACTIVE_LOCK).first()
+    return None, active_job
+
+
+def execute_refresh_job(job, force=False, refresh=None):
+    """
+    Run the refresh for ``job``, recording progress, result and errors on it.
+
+    ``force`` skips the conditional fetch so every row is re-evaluated.
+    ``refresh`` is the refresh to run (default ``run_refresh``; ``run_rate_refresh``
+    for rates only); both hold the same lock because both write countries.
+    The lock is released when the job finishes either way; exceptions from
+    the refresh are re-raised after being recorded.
+    """
+    def progress(phase, percent):
+        job.phase = phase
+        job.progress = percent
+        job.save(update_fields=["phase", "progress", "updated_at"])
+
+    job.status = RefreshJob.STATUS_RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=["status", "started_at", "updated_at"])
+
+    try:
+        job.result = (refresh or run_refresh)(progress=progress, force=force)
+        job.status = RefreshJob.STATUS_SUCCEEDED
+        job.progress = 100
+        return job.result
+    except Exception as e:
+        job.status = RefreshJob.STATUS_FAILED
+        job.error = str(e)
+        raise
+    finally:
+        job.lock = None
+        job.finished_at = timezone.now()
+        job.save()
+
+
+async def aexecute_refresh_job(job, force=False):
+    """:func:`execute_refresh_job` for async views, running :func:`arun_refresh`."""
+    def progress(phase, percent):
+        job.phase = phase
+        job.progress = percent
+        job.save(update_fields=["phase", "progress", "updated_at"])
+
+    job.status = RefreshJob.STATUS_RUNNING
+    job.started_at = timezone.now()
+    await job.asave(update_fields=["status", "started_at", "updated_at"])
+
+    try:
+        job.result = await arun_refresh(progress=progress, force=force)
+        job.status = RefreshJob.STATUS_SUCCEEDED
+        job.progress = 100
+        return job.result
+    except Exception as e:
+        job.status = RefreshJob.STATUS_FAILED
+        job.error = str(e)
+        raise
+    finally:
+        job.lock = None
+        job.finished_at = timezone.now()
+        await job.asave()
+
+
+def _run_job_in_background(job, force, refresh):
+    close_old_connections()
+    try:
+        execute_refresh_job(job, force=force, refresh=refresh)
+    except Exception as e:
+        logger.error("background refresh job %s failed: %s", job.id, e, exc_info=True)
+    finally:
+        connection.close()
+
+
+def start_refresh_job(job, force=False, refresh=None):
+    """Run ``job`` on a daemon worker thread and return immediately."""
+    worker = threading.Thread(
+        target=_run_job_in_background, args=(job, force, refresh), name=f"country-refresh-{job.id}", daemon=True
+    )
+    worker.start()
+    return worker
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from countryapi.jobs import acquire_refresh_job, execute_refresh_job
+
+
+class Command(BaseCommand):
+    help = "Refresh country data under the shared refresh lock (for cron/worker use)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="ignore ETag/Last-Modified and content hashes")
+
+    def handle(self, *args, **options):
+        job, active_job = acquire_refresh_job()
+        if job is None:
+            raise CommandError(f"a refresh is already in progress (job {active_job.id if active_job else None})")
+
+        try:
+            result = execute_refresh_job(job, force=options["force"])
+        except Exception as e:
+            raise CommandError(f"refresh job {job.id} failed: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"refresh job {job.id} finished: {result}"))
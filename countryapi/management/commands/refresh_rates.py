@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from countryapi.jobs import acquire_refresh_job, execute_refresh_job
+from countryapi.refresh import run_rate_refresh
+
+
+class Command(BaseCommand):
+    help = "Refresh exchange rates and rescale country GDP, without refetching countries (for cron/worker use)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="ignore ETag/Last-Modified and content hashes")
+
+    def handle(self, *args, **options):
+        job, active_job = acquire_refresh_job()
+        if job is None:
+            raise CommandError(f"a refresh is already in progress (job {active_job.id if active_job else None})")
+
+        try:
+            result = execute_refresh_job(job, force=options["force"], refresh=run_rate_refresh)
+        except Exception as e:
+            raise CommandError(f"rate refresh job {job.id} failed: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"rate refresh job {job.id} finished: {result}"))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('countryapi', '0003_refreshjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpstreamSource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('url', models.URLField(max_length=500)),
+                ('etag', models.CharField(blank=True, max_length=255, null=True)),
+                ('last_modified', models.CharField(blank=True, max_length=64, null=True)),
+                ('content_hash', models.CharField(blank=True, max_length=64, null=True)),
+                ('fetched_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='country',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='country',
+            name='last_refreshed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:35
+
+from django.db import migrations, models
+
+
+def populate_name_normalized(apps, schema_editor):
+    Country = apps.get_model('countryapi', 'Country')
+    countries = list(Country.objects.only('id', 'name'))
+    for country in countries:
+        country.name_normalized = country.name.lower()
+    Country.objects.bulk_update(countries, ['name_normalized'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('countryapi', '0004_conditional_refresh'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='country',
+            name='name_normalized',
+            field=models.CharField(editable=False, max_length=255, null=True),
+        ),
+        migrations.RunPython(populate_name_normalized, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='country',
+            name='name_normalized',
+            field=models.CharField(editable=False, max_length=255, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['region', 'estimated_gdp'], name='country_region_gdp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['region', 'population'], name='country_region_pop_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['region', 'name'], name='country_region_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['currency_code', 'estimated_gdp'], name='country_currency_gdp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['estimated_gdp'], name='country_gdp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['population'], name='country_population_idx'),
+        ),
+    ]
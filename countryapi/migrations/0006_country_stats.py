@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('countryapi', '0005_country_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CountryStats',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(editable=False, primary_key=True, serialize=False)),
+                ('total_countries', models.PositiveIntegerField(default=0)),
+                ('last_refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('total_population', models.BigIntegerField(default=0)),
+                ('total_estimated_gdp', models.DecimalField(decimal_places=0, default=0, max_digits=30)),
+                ('regions', models.JSONField(default=list)),
+                ('top_by_gdp', models.JSONField(default=list)),
+                ('top_by_population', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:02
+
+import hashlib
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_gdp_multiplier(apps, schema_editor):
+    # replaces the old per-refresh random multiplier, so estimated_gdp is recomputed with the stored one
+    Country = apps.get_model('countryapi', 'Country')
+    countries = list(Country.objects.only('id', 'name', 'population', 'exchange_rate'))
+    for country in countries:
+        digest = hashlib.sha256(f"{settings.GDP_MULTIPLIER_SEED}:{country.name}".encode("utf-8")).digest()
+        country.gdp_multiplier = 1000 + int.from_bytes(digest[:8], "big") % 1001
+        if country.population > 0 and country.exchange_rate is not None and country.exchange_rate > 0:
+            country.estimated_gdp = int(Decimal(country.population) * Decimal(country.gdp_multiplier) / country.exchange_rate)
+        else:
+            country.estimated_gdp = None
+    Country.objects.bulk_update(countries, ['gdp_multiplier', 'estimated_gdp'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('countryapi', '0007_exchange_rate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='country',
+            name='gdp_multiplier',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_gdp_multiplier, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='country',
+            name='gdp_multiplier',
+            field=models.PositiveSmallIntegerField(editable=False),
+        ),
+    ]
@@ -1,3 +1,7 @@
+import hashlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 import random
@@ -13,18 +17,132 @@ from decimal import Decimal
 class Country(models.Model):
     id = models.AutoField(primary_key=True, editable=False)
     name = models.CharField(max_length=255, unique=True, blank=False, null=False)
+    # lowercased name so case-insensitive lookups hit a unique index instead of LIKE/LOWER()
+    name_normalized = models.CharField(max_length=255, unique=True, editable=False)
     capital = models.CharField(max_length=255, blank=True, null=True)
     region = models.CharField(max_length=255,  blank=True, null=True)
     population = models.BigIntegerField(null=False, blank=False)
     currency_code = models.CharField(null=True, blank=False, max_length=10)
     exchange_rate = models.DecimalField(null=True, blank=False, max_digits=20, decimal_places=10)
     estimated_gdp = models.BigIntegerField(null=True, blank=False)
+    # estimated_gdp = population × gdp_multiplier ÷ exchange_rate; fixed per country (see derive_gdp_multiplier)
+    gdp_multiplier = models.PositiveSmallIntegerField(editable=False)
     flag_url = models.URLField(null=True, blank=True)
-    last_refreshed_at = models.DateTimeField(auto_now=True)
+    # sha256 of the upstream fields this row was built from; unchanged rows are skipped on refresh
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    last_refreshed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        # match the filter + sort combinations served by GetCountriesView
+        indexes = [
+            models.Index(fields=["region", "estimated_gdp"], name="country_region_gdp_idx"),
+            models.Index(fields=["region", "population"], name="country_region_pop_idx"),
+            models.Index(fields=["region", "name"], name="country_region_name_idx"),
+            models.Index(fields=["currency_code", "estimated_gdp"], name="country_currency_gdp_idx"),
+            models.Index(fields=["estimated_gdp"], name="country_gdp_idx"),
+            models.Index(fields=["population"], name="country_population_idx"),
+        ]
+    
+    @staticmethod
+    def normalize_name(name):
+        return name.lower()
     
+    @staticmethod
+    def derive_gdp_multiplier(name):
+        """GDP multiplier in [1000, 2000] from a hash of ``GDP_MULTIPLIER_SEED`` and the name, so every refresh agrees."""
+        digest = hashlib.sha256(f"{settings.GDP_MULTIPLIER_SEED}:{name}".encode("utf-8")).digest()
+        return 1000 + int.from_bytes(digest[:8], "big") % 1001
     
+    def save(self, *args, **kwargs):
+        self.name_normalized = self.normalize_name(self.name)
+        if self.gdp_multiplier is None:
+            self.gdp_multiplier = self.derive_gdp_multiplier(self.name)
+        if kwargs.get("update_fields") is not None and "name" in kwargs["update_fields"]:
+            kwargs["update_fields"] = set(kwargs["update_fields"]) | {"name_normalized"}
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return self.name
     
-   
\ No newline at end of file
+   
+
+class UpstreamSource(models.Model):
+    """Cache validators for an upstream payload, used for conditional refresh fetches."""
+    key = models.CharField(max_length=50, unique=True)
+    url = models.URLField(max_length=500)
+    etag = models.CharField(max_length=255, null=True, blank=True)
+    last_modified = models.CharField(max_length=64, null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.key
+
+
+class ExchangeRate(models.Model):
+    """Latest USD exchange rate per currency, written by both the full and the rate-only refresh."""
+    currency_code = models.CharField(max_length=10, unique=True)
+    rate = models.DecimalField(max_digits=20, decimal_places=10)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.currency_code} {self.rate}"
+
+
+class RefreshJob(models.Model):
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    # value held in ``lock`` by the single queued/running job; the unique index
+    # makes a second concurrent refresh fail to insert, across processes
+    ACTIVE_LOCK = "refresh"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    lock = models.CharField(max_length=20, unique=True, null=True, blank=True, editable=False)
+    phase = models.CharField(max_length=20, blank=True, default="")
+    progress = models.PositiveSmallIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+
+class CountryStats(models.Model):
+    """
+    Snapshot of country aggregates, rebuilt whenever countries are written.
+
+    There is a single row (``SNAPSHOT_ID``); readers such as the status
+    endpoint and the summary image fetch it by primary key instead of
+    aggregating over the country table. See ``countryapi.stats``.
+    """
+    SNAPSHOT_ID = 1
+
+    id = models.PositiveSmallIntegerField(primary_key=True, editable=False)
+    total_countries = models.PositiveIntegerField(default=0)
+    last_refreshed_at = models.DateTimeField(null=True, blank=True)
+    total_population = models.BigIntegerField(default=0)
+    # summed GDP can exceed a signed 64-bit integer
+    total_estimated_gdp = models.DecimalField(max_digits=30, decimal_places=0, default=0)
+    # [{"region", "countries", "population", "estimated_gdp"}], ordered by region
+    regions = models.JSONField(default=list)
+    # [{"name", "estimated_gdp"}] / [{"name", "population"}], largest first
+    top_by_gdp = models.JSONField(default=list)
+    top_by_population = models.JSONField(default=list)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"country stats ({self.total_countries} countries at {self.computed_at})"
@@ -0,0 +1,517 @@
+import hashlib
+import json
+import logging
+import time
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+from decouple import config
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, F, OuterRef, Subquery, When
+from django.db.models.functions import Cast, Floor
+from django.utils import timezone
+
+from catapi.cache import bump_generation
+from .fetchers import AsyncSourceFetcher, SourceFetcher
+from .models import Country, ExchangeRate, UpstreamSource
+from .stats import rebuild_country_stats
+from .summary_image import generate_summary_image
+
+
+logger = logging.getLogger(__name__)
+
+COUNTRY_URL = config("COUNTRY_URL")
+RATE_URL = config("RATE_URL")
+TIME_OUT = 5
+
+# generation namespace for cached country responses; bumped whenever rows change
+COUNTRIES_CACHE_NAMESPACE = "countries"
+
+# fields copied from the upstream payload onto Country rows; name is the lookup key
+REFRESH_FIELDS = [
+    "capital",
+    "region",
+    "population",
+    "currency_code",
+    "exchange_rate",
+    "estimated_gdp",
+    "gdp_multiplier",
+    "flag_url",
+    "fingerprint",
+]
+
+# upstream inputs hashed into Country.fingerprint; estimated_gdp is derived from these and
+# exchange_rate. The rate is compared on its own because the rate-only refresh rewrites it
+# in SQL, where the fingerprint cannot be recomputed
+FINGERPRINT_FIELDS = ["capital", "region", "population", "currency_code", "gdp_multiplier", "flag_url"]
+
+
+class InvalidUpstreamData(Exception):
+    """Raised when an upstream source returns a payload of the wrong shape."""
+
+
+class PhaseTimer:
+    """Collects wall-clock timings (in ms) for the named phases of a refresh."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def _normalize_rate(rate_value):
+    # mirror what DecimalField will store so the in-memory diff compares like with like
+    field = Country._meta.get_field("exchange_rate")
+    try:
+        rate = field.to_python(rate_value)
+    except Exception:
+        return None
+    if rate is None:
+        return None
+    return rate.quantize(Decimal(1).scaleb(-field.decimal_places))
+
+
+def country_fingerprint(name, fields):
+    source = [name] + [fields[field] for field in FINGERPRINT_FIELDS]
+    encoded = json.dumps(source, default=str, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def estimate_gdp(population, exchange_rate, gdp_multiplier):
+    """``population × gdp_multiplier ÷ exchange_rate``, or None without a population and a positive rate."""
+    if population > 0 and exchange_rate is not None and exchange_rate > 0:
+        return int(Decimal(population) * Decimal(gdp_multiplier) / exchange_rate)
+    return None
+
+
+def build_country_rows(countries_data, rates):
+    """
+    Turn the raw upstream payloads into a ``{name: fields}`` mapping.
+
+    Returns the mapping and the number of entries skipped for missing names.
+    Later duplicates of the same name win, matching the old per-row upsert.
+    """
+    rows = {}
+    skipped_count = 0
+
+    for country_data in countries_data:
+        name = country_data.get("name")
+        if not name:
+            logger.warning("country name not found skipping")
+            skipped_count += 1
+            continue
+
+        population = country_data.get("population") or 0
+
+        currency_code = None
+        currencies = country_data.get("currencies", [])
+        if currencies and isinstance(currencies, list) and isinstance(currencies[0], dict):
+            currency_code = currencies[0].get("code")
+
+        exchange_rate = None
+        if currency_code:
+            rate_value = rates.get(currency_code)
+            if rate_value is not None:
+                exchange_rate = _normalize_rate(rate_value)
+                if exchange_rate is None:
+                    logger.warning("invalid exchange rate for %s: %s", currency_code, rate_value)
+
+        gdp_multiplier = Country.derive_gdp_multiplier(name)
+        try:
+            estimated_gdp = estimate_gdp(population, exchange_rate, gdp_multiplier)
+        except (ValueError, ZeroDivisionError, InvalidOperation, OverflowError) as e:
+            logger.warning("error get estimated_gdp for %s: error %s", name, e)
+            estimated_gdp = None
+
+        fields = {
+            "capital": country_data.get("capital"),
+            "region": country_data.get("region"),
+            "population": population,
+            "currency_code": currency_code,
+            "exchange_rate": exchange_rate,
+            "estimated_gdp": estimated_gdp,
+            "gdp_multiplier": gdp_multiplier,
+            "flag_url": country_data.get("flag"),
+        }
+        fields["fingerprint"] = country_fingerprint(name, fields)
+        rows[name] = fields
+
+    return rows, skipped_count
+
+
+def bulk_upsert_countries(rows, last_refreshed_at, chunk_size=None):
+    """
+    Write ``rows`` (as returned by ``build_country_rows``) in a single transaction.
+
+    Existing countries are loaded with one query and compared by fingerprint
+    and exchange rate; only new or changed rows are written via ``bulk_create``/``bulk_update`` in
+    chunks of ``chunk_size``, and unchanged rows (including their
+    ``last_refreshed_at``) are left alone. Returns ``(created, updated, unchanged)``.
+    """
+    chunk_size = chunk_size or settings.REFRESH_CHUNK_SIZE
+    to_create = []
+    to_update = []
+    unchanged_count = 0
+
+    with transaction.atomic():
+        existing = Country.objects.in_bulk(list(rows), field_name="name")
+
+        for name, fields in rows.items():
+            country_obj = existing.get(name)
+            if country_obj is None:
+                to_create.append(Country(
+                    name=name,
+                    name_normalized=Country.normalize_name(name),
+                    last_refreshed_at=last_refreshed_at,
+                    **fields,
+                ))
+                logger.info("created new for country record for %s", name)
+                continue
+
+            if country_obj.fingerprint == fields["fingerprint"] and country_obj.exchange_rate == fields["exchange_rate"]:
+                unchanged_count += 1
+                continue
+
+            for field, value in fields.items():
+                setattr(country_obj, field, value)
+            country_obj.last_refreshed_at = last_refreshed_at
+            to_update.append(country_obj)
+            logger.info("updated for country record for %s", name)
+
+        if to_create:
+            Country.objects.bulk_create(to_create, batch_size=chunk_size)
+        if to_update:
+            Country.objects.bulk_update(
+                to_update, REFRESH_FIELDS + ["last_refreshed_at"], batch_size=chunk_size
+            )
+
+    return len(to_create), len(to_update), unchanged_count
+
+
+def save_exchange_rates(rates, updated_at, chunk_size=None):
+    """
+    Upsert the upstream ``{code: rate}`` mapping into ``ExchangeRate``.
+
+    Missing, invalid and non-positive rates are left out (and dropped from
+    the table). Returns ``(changed, removed)``: ``{code: rate}`` for new or
+    different rates and the set of codes no longer present.
+    """
+    chunk_size = chunk_size or settings.REFRESH_CHUNK_SIZE
+    normalized = {}
+    for code, value in rates.items():
+        rate = _normalize_rate(value)
+        if rate is None or rate <= 0:
+            logger.warning("invalid exchange rate for %s: %s", code, value)
+            continue
+        normalized[code] = rate
+
+    existing = dict(ExchangeRate.objects.values_list("currency_code", "rate"))
+    changed = {code: rate for code, rate in normalized.items() if existing.get(code) != rate}
+    removed = set(existing) - set(normalized)
+
+    if changed:
+        ExchangeRate.objects.bulk_create(
+            [ExchangeRate(currency_code=code, rate=rate, updated_at=updated_at) for code, rate in changed.items()],
+            update_conflicts=True,
+            unique_fields=["currency_code"],
+            update_fields=["rate", "updated_at"],
+            batch_size=chunk_size,
+        )
+    if removed:
+        ExchangeRate.objects.filter(currency_code__in=removed).delete()
+    return changed, removed
+
+
+def apply_exchange_rates(changed, removed, last_refreshed_at):
+    """
+    Move countries onto the rates in ``ExchangeRate`` without refetching them.
+
+    One UPDATE, joined to ``ExchangeRate`` on currency code, sets the new
+    rate and recomputes ``population × gdp_multiplier ÷ rate`` for every
+    country whose currency changed rate. Countries whose currency lost its
+    rate get NULL rate and GDP, as in a full refresh. Returns the number of
+    countries updated.
+    """
+    updated = 0
+
+    if changed:
+        new_rate = Subquery(
+            ExchangeRate.objects.filter(currency_code=OuterRef("currency_code")).values("rate")[:1]
+        )
+        # FLOOR so MySQL (whose CAST rounds) truncates like estimate_gdp's int()
+        gdp = Cast(Floor(F("population") * F("gdp_multiplier") / new_rate), BigIntegerField())
+        updated += Country.objects.filter(currency_code__in=changed).update(
+            exchange_rate=new_rate,
+            estimated_gdp=Case(When(population__gt=0, then=gdp), default=None),
+            last_refreshed_at=last_refreshed_at,
+        )
+
+    if removed:
+        updated += Country.objects.filter(currency_code__in=removed).exclude(exchange_rate__isnull=True).update(
+            exchange_rate=None, estimated_gdp=None, last_refreshed_at=last_refreshed_at,
+        )
+    return updated
+
+
+def _source_urls():
+    return {"countries": COUNTRY_URL, "rates": RATE_URL}
+
+
+def _resolve_sources(urls, stored):
+    sources = {source.key: source for source in stored}
+    for key, url in urls.items():
+        if key not in sources:
+            sources[key] = UpstreamSource(key=key, url=url)
+        elif sources[key].url != url:
+            # a moved source starts over: its old validators describe another payload
+            source = sources[key]
+            source.url = url
+            source.etag = source.last_modified = source.content_hash = None
+    return sources
+
+
+def _load_sources():
+    urls = _source_urls()
+    return _resolve_sources(urls, UpstreamSource.objects.filter(key__in=urls))
+
+
+async def _aload_sources():
+    urls = _source_urls()
+    return _resolve_sources(urls, [source async for source in UpstreamSource.objects.filter(key__in=urls)])
+
+
+def _conditional_fetch_plan(sources, force):
+    urls = {key: source.url for key, source in sources.items()}
+    validators = {} if force else {key: (source.etag, source.last_modified) for key, source in sources.items()}
+    return urls, validators
+
+
+def _unchanged_and_refetch(sources, urls, responses, force):
+    unchanged = {
+        key for key, response in responses.items()
+        if response.not_modified or (
+            not force and response.content_hash and response.content_hash == sources[key].content_hash
+        )
+    }
+    refetch = {key: urls[key] for key, response in responses.items() if response.not_modified}
+    if unchanged == set(urls):
+        refetch = {}
+    return unchanged, refetch
+
+
+def _fetch_sources(sources, force):
+    """
+    Conditionally fetch every source; returns ``(responses, unchanged_keys)``.
+
+    A source is unchanged when it answers 304 or its body hashes to the stored
+    ``content_hash``. If only some sources are unchanged, the 304 ones are
+    fetched again unconditionally, because the refresh needs every payload.
+    """
+    fetcher = SourceFetcher(timeout=TIME_OUT)
+    urls, validators = _conditional_fetch_plan(sources, force)
+
+    responses = fetcher.fetch_all(urls, validators)
+    unchanged, refetch = _unchanged_and_refetch(sources, urls, responses, force)
+    if refetch:
+        responses.update(fetcher.fetch_all(refetch))
+    return responses, unchanged
+
+
+async def _afetch_sources(sources, force):
+    """Async :func:`_fetch_sources` over httpx."""
+    fetcher = AsyncSourceFetcher(timeout=TIME_OUT)
+    urls, validators = _conditional_fetch_plan(sources, force)
+
+    responses = await fetcher.fetch_all(urls, validators)
+    unchanged, refetch = _unchanged_and_refetch(sources, urls, responses, force)
+    if refetch:
+        responses.update(await fetcher.fetch_all(refetch))
+    return responses, unchanged
+
+
+def _save_sources(sources, responses, fetched_at):
+    for key, source in sources.items():
+        response = responses[key]
+        source.etag = response.etag
+        source.last_modified = response.last_modified
+        source.content_hash = response.content_hash or source.content_hash
+        source.fetched_at = fetched_at
+        source.save()
+
+
+def _new_result(timer, last_refreshed_at):
+    return {
+        "not_modified": False,
+        "countries_updated": 0,
+        "countries_created": 0,
+        "countries_skipped": 0,
+        "countries_unchanged": 0,
+        "countries_dirty": 0,
+        "time_refreshed": last_refreshed_at,
+        "timings_ms": timer.timings,
+    }
+
+
+def _redraw_image(timer, report):
+    report("image", 80)
+    with timer.phase("image"):
+        try:
+            generate_summary_image()
+            logger.info("Summary image generated successfully.")
+        except Exception as e:
+            logger.error("Failed to generate summary image, but refresh succeeded: %s", e)
+
+
+def _apply_refresh(sources, responses, unchanged_sources, result, timer, report):
+    """Everything after the fetch phase: validate, transform, write, redraw the image."""
+    last_refreshed_at = result["time_refreshed"]
+    if unchanged_sources == set(sources):
+        logger.info("upstream sources unchanged since last refresh, skipping")
+        _save_sources(sources, responses, last_refreshed_at)
+        result["not_modified"] = True
+        return result
+
+    countries_data = responses["countries"].payload
+    if not isinstance(countries_data, list) or not isinstance(responses["rates"].payload, dict):
+        raise InvalidUpstreamData("Invalid data format from external API")
+    er = responses["rates"].payload.get("rates", {})
+    logger.info("data fetched from %d the url", len(countries_data))
+
+    report("transform", 40)
+    with timer.phase("transform"):
+        rows, skipped_count = build_country_rows(countries_data, er)
+
+    report("write", 50)
+    with timer.phase("write"):
+        # one transaction, so the saved validators never outlive a failed write (a 304 would skip it for good)
+        with transaction.atomic():
+            created_count, updated_count, unchanged_count = bulk_upsert_countries(rows, last_refreshed_at)
+            save_exchange_rates(er, last_refreshed_at)
+            _save_sources(sources, responses, last_refreshed_at)
+            if created_count or updated_count:
+                rebuild_country_stats()
+    if created_count or updated_count:
+        bump_generation(COUNTRIES_CACHE_NAMESPACE)
+    logger.info("refresh completed update %d time, created %d times, and skipped %d time", updated_count, created_count, skipped_count)
+
+    _redraw_image(timer, report)
+
+    result.update({
+        "countries_updated": updated_count,
+        "countries_created": created_count,
+        "countries_skipped": skipped_count,
+        "countries_unchanged": unchanged_count,
+        "countries_dirty": created_count + updated_count,
+    })
+    return result
+
+
+def run_refresh(progress=None, force=False):
+    """
+    Fetch both upstream sources, upsert changed countries and redraw the summary image.
+
+    When every source is unchanged since the last refresh (304 or identical
+    body) nothing is written, unless ``force`` is set. ``progress(phase,
+    percent)`` is called as each phase starts. Upstream failures surface as
+    ``requests`` exceptions or ``InvalidUpstreamData``. Returns the counts and
+    per-phase timings reported to clients.
+    """
+    report = progress or (lambda phase, percent: None)
+    timer = PhaseTimer()
+    result = _new_result(timer, timezone.now())
+
+    report("fetch", 0)
+    with timer.phase("fetch"):
+        logger.info("fetching countries and rates data from url")
+        sources = _load_sources()
+        responses, unchanged_sources = _fetch_sources(sources, force)
+
+    return _apply_refresh(sources, responses, unchanged_sources, result, timer, report)
+
+
+async def arun_refresh(progress=None, force=False):
+    """
+    :func:`run_refresh` for async views.
+
+    The fetch phase runs on the event loop (async ORM + httpx; failures
+    raise ``httpx`` exceptions). The write phase needs ``transaction.atomic``,
+    which the async ORM does not support, so it and the rest of the refresh
+    run in one ``sync_to_async`` call. ``progress`` is a sync callable.
+    """
+    report = progress or (lambda phase, percent: None)
+    timer = PhaseTimer()
+    result = _new_result(timer, timezone.now())
+
+    await sync_to_async(report)("fetch", 0)
+    with timer.phase("fetch"):
+        logger.info("fetching countries and rates data from url")
+        sources = await _aload_sources()
+        responses, unchanged_sources = await _afetch_sources(sources, force)
+
+    return await sync_to_async(_apply_refresh)(sources, responses, unchanged_sources, result, timer, report)
+
+
+def run_rate_refresh(progress=None, force=False):
+    """
+    Refresh exchange rates only: fetch the rates source, upsert ``ExchangeRate``
+    and rescale the affected countries' rate and GDP in the database.
+
+    Country metadata is not fetched. Takes the same ``progress``/``force``
+    arguments as :func:`run_refresh` and shares its conditional fetch state,
+    so an unchanged rates payload writes nothing.
+    """
+    report = progress or (lambda phase, percent: None)
+    timer = PhaseTimer()
+    last_refreshed_at = timezone.now()
+    result = {
+        "not_modified": False,
+        "rates_updated": 0,
+        "rates_removed": 0,
+        "countries_updated": 0,
+        "time_refreshed": last_refreshed_at,
+        "timings_ms": timer.timings,
+    }
+
+    report("fetch", 0)
+    with timer.phase("fetch"):
+        logger.info("fetching rates data from url")
+        sources = {"rates": _load_sources()["rates"]}
+        responses, unchanged_sources = _fetch_sources(sources, force)
+
+    if unchanged_sources == set(sources):
+        logger.info("exchange rates unchanged since last refresh, skipping")
+        _save_sources(sources, responses, last_refreshed_at)
+        result["not_modified"] = True
+        return result
+
+    payload = responses["rates"].payload
+    if not isinstance(payload, dict) or not isinstance(payload.get("rates", {}), dict):
+        raise InvalidUpstreamData("Invalid data format from external API")
+
+    report("write", 50)
+    with timer.phase("write"):
+        with transaction.atomic():
+            changed, removed = save_exchange_rates(payload.get("rates", {}), last_refreshed_at)
+            countries_updated = apply_exchange_rates(changed, removed, last_refreshed_at)
+            _save_sources(sources, responses, last_refreshed_at)
+        if countries_updated:
+            rebuild_country_stats()
+            bump_generation(COUNTRIES_CACHE_NAMESPACE)
+    logger.info("rate refresh completed: %d rates changed, %d countries updated", len(changed), countries_updated)
+
+    _redraw_image(timer, report)
+
+    result.update({
+        "rates_updated": len(changed),
+        "rates_removed": len(removed),
+        "countries_updated": countries_updated,
+    })
+    return result
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Country
+from catapi.fast_serializers import compile_row_serializer
+from .models import Country, CountryStats, RefreshJob
 
 class CountrySerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,4 +10,27 @@ class CountrySerializer(serializers.ModelSerializer):
                  "last_refreshed_at"
         ]
         
-        read_only_fields = ["id", "last_refreshed_at"]
\ No newline at end of file
+        read_only_fields = ["id", "last_refreshed_at"]
+
+
+# read-only fast path for list endpoints: Country.objects.values(*COUNTRY_COLUMNS) -> countries_to_dicts
+COUNTRY_COLUMNS, countries_to_dicts = compile_row_serializer(CountrySerializer)
+
+class RefreshJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.UUIDField(source="id", read_only=True)
+
+    class Meta:
+        model = RefreshJob
+        fields = ["job_id", "status", "phase", "progress", "result", "error",
+                  "created_at", "started_at", "finished_at"
+        ]
+
+
+class CountryStatsSerializer(serializers.ModelSerializer):
+    total_estimated_gdp = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = CountryStats
+        fields = ["total_countries", "last_refreshed_at", "total_population", "total_estimated_gdp",
+                  "regions", "top_by_gdp", "top_by_population", "computed_at"
+        ]
@@ -0,0 +1,64 @@
+import logging
+
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .models import Country, CountryStats
+
+
+logger = logging.getLogger(__name__)
+
+# entries kept in each top-N list of the snapshot
+TOP_N = 10
+
+
+def _top(field):
+    return [
+        {"name": name, field: value}
+        for name, value in Country.objects.exclude(**{f"{field}__isnull": True})
+        .order_by(f"-{field}", "pk")
+        .values_list("name", field)[:TOP_N]
+    ]
+
+
+def rebuild_country_stats():
+    """Recompute the ``CountryStats`` snapshot from the country table (four queries) and save it."""
+    totals = Country.objects.aggregate(
+        total=Count("pk"),
+        latest=Max("last_refreshed_at"),
+        population=Sum("population"),
+        estimated_gdp=Sum("estimated_gdp"),
+    )
+    regions = [
+        {
+            "region": row["region"],
+            "countries": row["countries"],
+            "population": int(row["population"] or 0),
+            "estimated_gdp": int(row["estimated_gdp"] or 0),
+        }
+        for row in Country.objects.order_by("region").values("region").annotate(
+            countries=Count("pk"), population=Sum("population"), estimated_gdp=Sum("estimated_gdp"),
+        )
+    ]
+    stats = CountryStats(
+        id=CountryStats.SNAPSHOT_ID,
+        total_countries=totals["total"],
+        last_refreshed_at=totals["latest"],
+        total_population=int(totals["population"] or 0),
+        total_estimated_gdp=int(totals["estimated_gdp"] or 0),
+        regions=regions,
+        top_by_gdp=_top("estimated_gdp"),
+        top_by_population=_top("population"),
+        computed_at=timezone.now(),
+    )
+    stats.save()
+    logger.debug("country stats rebuilt: %d countries in %d regions", stats.total_countries, len(regions))
+    return stats
+
+
+def get_country_stats():
+    """The current snapshot, built on first use when no refresh has written one yet."""
+    try:
+        return CountryStats.objects.get(pk=CountryStats.SNAPSHOT_ID)
+    except CountryStats.DoesNotExist:
+        return rebuild_country_stats()
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from PIL import Image, ImageDraw, ImageFont
+
+from .stats import get_country_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+IMAGE_FILENAME = 'summary.png'
+FINGERPRINT_FILENAME = 'summary.fingerprint'
+
+IMAGE_WIDTH = 800
+IMAGE_HEIGHT = 600
+
+TOP_COUNTRIES = 5
+
+# bump when the drawing code changes so existing images are redrawn
+RENDER_VERSION = 1
+
+
+def cache_dir():
+    return settings.SUMMARY_IMAGE_DIR
+
+
+def image_path():
+    return os.path.join(cache_dir(), IMAGE_FILENAME)
+
+
+def _fingerprint_path():
+    return os.path.join(cache_dir(), FINGERPRINT_FILENAME)
+
+
+@lru_cache(maxsize=1)
+def load_fonts():
+    """The (large, medium, small) fonts, loaded once per process."""
+    try:
+        fonts = (
+            ImageFont.truetype("arial.ttf", size=28),
+            ImageFont.truetype("arial.ttf", size=22),
+            ImageFont.truetype("arial.ttf", size=18),
+        )
+        logger.debug("Custom fonts loaded successfully.")
+        return fonts
+    except OSError as e:
+        logger.warning("Specific font not found, using default font. Error: %s", e)
+        default = ImageFont.load_default()
+        return default, default, default
+
+
+def summary_inputs():
+    """Everything the image shows (count, last refresh, top by GDP), read from the stats snapshot."""
+    stats = get_country_stats()
+    top_gdp = [(row["name"], row["estimated_gdp"]) for row in stats.top_by_gdp[:TOP_COUNTRIES]]
+    return stats.total_countries, stats.last_refreshed_at, top_gdp
+
+
+def fingerprint(total_countries, last_refreshed_at, top_gdp):
+    """Hash of the image inputs; the image is only redrawn when it changes."""
+    payload = json.dumps(
+        [RENDER_VERSION, IMAGE_WIDTH, IMAGE_HEIGHT, total_countries,
+         last_refreshed_at.isoformat() if last_refreshed_at else None, top_gdp]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _stored_fingerprint():
+    try:
+        with open(_fingerprint_path()) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def atomic_write(path, write):
+    """
+    Write ``path`` through a temporary file in the same directory and rename it
+    into place, so readers only ever see the old or the complete new file.
+    ``write`` is called with the open binary file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        # mkstemp creates 0600 files; the front-end server may need to read them for sendfile
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def render_summary_image(total_countries, last_refreshed_at, top_gdp):
+    """Draw the summary as a PIL image."""
+    image = Image.new('RGB', (IMAGE_WIDTH, IMAGE_HEIGHT), color=(255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    font_large, font_medium, font_small = load_fonts()
+
+    if last_refreshed_at is None:
+        logger.warning("No last_refreshed_at timestamp found in Country records for image. Using current time.")
+        last_refreshed_at = timezone.now()
+
+    y_offset = 50
+    line_height_large = 35
+    line_height_medium = 30
+    line_height_small = 25
+
+    draw.text((50, y_offset), "Country Data Summary", fill=(0, 0, 0), font=font_large)
+    y_offset += line_height_large + 10
+
+    draw.text((50, y_offset), f"Total Countries: {total_countries}", fill=(0, 0, 0), font=font_medium)
+    y_offset += line_height_medium
+
+    if timezone.is_naive(last_refreshed_at):
+        last_refreshed_at = timezone.make_aware(last_refreshed_at)
+    formatted_timestamp = last_refreshed_at.strftime("%Y-%m-%d %H:%M:%S %Z")
+
+    draw.text((50, y_offset), f"Last Refresh: {formatted_timestamp}", fill=(0, 0, 0), font=font_medium)
+    y_offset += line_height_medium + 20
+
+    draw.text((50, y_offset), f"Top {TOP_COUNTRIES} Countries by GDP:", fill=(0, 0, 0), font=font_large)
+    y_offset += line_height_large
+
+    if top_gdp:
+        for name, estimated_gdp in top_gdp:
+            draw.text((70, y_offset), f"{name}: {estimated_gdp:,.2f}", fill=(50, 50, 50), font=font_small)
+            y_offset += line_height_small
+
+            if y_offset > IMAGE_HEIGHT - 30:
+                logger.debug("Reached near bottom of image, stopping list drawing.")
+                break
+    else:
+        draw.text((70, y_offset), "No countries with calculated GDP found.", fill=(100, 100, 100), font=font_small)
+
+    return image
+
+
+def generate_summary_image(force=False):
+    """
+    Redraw ``summary.png`` when its inputs changed since the last drawing.
+
+    Returns True when a new image was written, False when the existing one is
+    current (or drawing failed; failures are logged, not raised).
+    """
+    try:
+        os.makedirs(cache_dir(), exist_ok=True)
+        inputs = summary_inputs()
+        digest = fingerprint(*inputs)
+        path = image_path()
+        if not force and os.path.exists(path) and _stored_fingerprint() == digest:
+            logger.debug("Summary image inputs unchanged, keeping the existing image.")
+            return False
+
+        image = render_summary_image(*inputs)
+        atomic_write(path, lambda f: image.save(f, format="PNG"))
+        atomic_write(_fingerprint_path(), lambda f: f.write(digest.encode("ascii")))
+        logger.info("Summary image generated successfully and saved to %s", path)
+        return True
+
+    except Exception as e:
+        logger.critical("Failed to generate summary image: %s", e, exc_info=True)
+        return False
+
+
+def file_response(request, path, content_type):
+    """
+    Serve ``path`` with ETag/Last-Modified validators, answering 304 when the client's copy is current.
+
+    The validators come from the open file's mtime and size, so they change
+    whenever a new file is renamed into place. With ``SENDFILE_HEADER`` set
+    (``X-Accel-Redirect`` for nginx, ``X-Sendfile`` for Apache/lighttpd)
+    the body is left to the front-end server; otherwise ``FileResponse``
+    streams it, through ``wsgi.file_wrapper`` (sendfile) where the server
+    offers one. Raises ``FileNotFoundError`` when there is no file.
+    """
+    f = open(path, "rb")
+    try:
+        stat = os.fstat(f.fileno())
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        last_modified = int(stat.st_mtime)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None and settings.SENDFILE_HEADER:
+            response = HttpResponse(content_type=content_type)
+            if settings.SENDFILE_HEADER.lower() == "x-accel-redirect":
+                relative = os.path.relpath(path, cache_dir()).replace(os.sep, "/")
+                response[settings.SENDFILE_HEADER] = settings.SENDFILE_URL_PREFIX.rstrip("/") + "/" + relative
+            else:
+                response[settings.SENDFILE_HEADER] = os.path.abspath(path)
+        if response is not None:
+            f.close()
+        else:
+            response = FileResponse(f, content_type=content_type)
+    except BaseException:
+        f.close()
+        raise
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "no-cache"
+    return response
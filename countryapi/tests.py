@@ -1,3 +1,675 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+
+from catapi import metrics
+from catapi.renderers import ORJSONRenderer
+from catapi.structured_logging import JSONFormatter, QueueListenerHandler, RateLimitFilter
+
+from . import image_variants, summary_image, views
+from .fetchers import SourceFetcher
+from .jobs import acquire_refresh_job, execute_refresh_job
+from .models import Country, ExchangeRate, RefreshJob, UpstreamSource
+from .refresh import build_country_rows, bulk_upsert_countries, estimate_gdp
+from .serializer import COUNTRY_COLUMNS, CountrySerializer, countries_to_dicts
+from .stats import rebuild_country_stats
+
+
+COUNTRIES_PAYLOAD = [
+    {"name": "Nigeria", "capital": "Abuja", "region": "Africa", "population": 206139589,
+     "currencies": [{"code": "NGN"}], "flag": "https://flagcdn.com/ng.svg"},
+    {"name": "Ghana", "capital": "Accra", "region": "Africa", "population": 31072940,
+     "currencies": [{"code": "GHS"}], "flag": "https://flagcdn.com/gh.svg"},
+    {"name": "Antarctica", "region": "Polar", "population": 1000},
+    {"capital": "Nowhere"},
+]
+RATES_PAYLOAD = {"NGN": 1600.23, "GHS": 15.3}
+
+
+class BulkRefreshTests(TestCase):
+    def test_build_country_rows(self):
+        rows, skipped = build_country_rows(COUNTRIES_PAYLOAD, RATES_PAYLOAD)
+        self.assertEqual(skipped, 1)
+        self.assertEqual(set(rows), {"Nigeria", "Ghana", "Antarctica"})
+        self.assertEqual(rows["Nigeria"]["exchange_rate"], Decimal("1600.2300000000"))
+        self.assertIsInstance(rows["Nigeria"]["estimated_gdp"], int)
+        self.assertIsNone(rows["Antarctica"]["currency_code"])
+        self.assertIsNone(rows["Antarctica"]["estimated_gdp"])
+
+    def test_gdp_is_deterministic(self):
+        first, _ = build_country_rows(COUNTRIES_PAYLOAD, RATES_PAYLOAD)
+        second, _ = build_country_rows(COUNTRIES_PAYLOAD, RATES_PAYLOAD)
+        self.assertEqual(first, second)
+        nigeria = first["Nigeria"]
+        self.assertTrue(1000 <= nigeria["gdp_multiplier"] <= 2000)
+        self.assertEqual(nigeria["estimated_gdp"], int(Decimal(206139589) * nigeria["gdp_multiplier"] / Decimal("1600.23")))
+        with override_settings(GDP_MULTIPLIER_SEED="another"):
+            self.assertNotEqual(Country.derive_gdp_multiplier("Nigeria"), nigeria["gdp_multiplier"])
+
+    def test_bulk_upsert_creates_updates_and_skips_unchanged(self):
+        rows, _ = build_country_rows(COUNTRIES_PAYLOAD, RATES_PAYLOAD)
+        with self.assertNumQueries(4):
+            # savepoint, existing-row lookup, one INSERT, release
+            created, updated, unchanged = bulk_upsert_countries(rows, timezone.now())
+        self.assertEqual((created, updated, unchanged), (3, 0, 0))
+        self.assertEqual(Country.objects.count(), 3)
+
+        payload = json.loads(json.dumps(COUNTRIES_PAYLOAD))
+        payload[1]["population"] += 1
+        rows, _ = build_country_rows(payload, RATES_PAYLOAD)
+        created, updated, unchanged = bulk_upsert_countries(rows, timezone.now(), chunk_size=1)
+        self.assertEqual((created, updated, unchanged), (0, 1, 2))
+        self.assertEqual(Country.objects.get(name="Ghana").population, 31072941)
+
+
+class StubServer:
+    """Local HTTP server that answers every GET with ``payload`` after ``delay`` seconds."""
+
+    def __init__(self, payload, delay=0.0, etag=None):
+        body = json.dumps(payload).encode()
+        self.hits = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                time.sleep(delay)
+                self.hits.append(handler.headers.get("If-None-Match"))
+                if etag and handler.headers.get("If-None-Match") == etag:
+                    handler.send_response(304)
+                    handler.end_headers()
+                    return
+                handler.send_response(200)
+                if etag:
+                    handler.send_header("ETag", etag)
+                handler.send_header("Content-Type", "application/json")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SourceFetcherTests(SimpleTestCase):
+    def test_sources_are_fetched_concurrently(self):
+        delay = 0.4
+        with StubServer(COUNTRIES_PAYLOAD, delay) as countries, StubServer({"rates": RATES_PAYLOAD}, delay) as rates:
+            start = time.perf_counter()
+            payloads = SourceFetcher(timeout=5).fetch_all({"countries": countries.url, "rates": rates.url})
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(payloads["countries"].payload, COUNTRIES_PAYLOAD)
+        self.assertEqual(payloads["rates"].payload["rates"], RATES_PAYLOAD)
+        # close to max(latencies), well short of their sum
+        self.assertLess(elapsed, delay * 1.5)
+
+
+@mock.patch("countryapi.refresh.generate_summary_image")
+class RefreshJobTests(APITestCase):
+    def test_lock_rejects_concurrent_refresh(self, _image):
+        job, _ = acquire_refresh_job()
+        self.assertIsNotNone(job)
+        second, active = acquire_refresh_job()
+        self.assertIsNone(second)
+        self.assertEqual(active, job)
+
+        response = self.client.post(reverse("country-refresh"))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["job_id"], job.id)
+
+    def test_sync_refresh_releases_lock(self, _image):
+        with StubServer(COUNTRIES_PAYLOAD) as countries, StubServer({"rates": RATES_PAYLOAD}) as rates, \
+                mock.patch("countryapi.refresh.COUNTRY_URL", countries.url), \
+                mock.patch("countryapi.refresh.RATE_URL", rates.url):
+            response = self.client.post(reverse("country-refresh"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["countries_created"], 3)
+        self.assertEqual(set(response.data["timings_ms"]), {"fetch", "transform", "write", "image"})
+        job = RefreshJob.objects.get(id=response.data["job_id"])
+        self.assertEqual(job.status, RefreshJob.STATUS_SUCCEEDED)
+        self.assertIsNone(job.lock)
+
+    def test_async_refresh_reports_status(self, _image):
+        result = {"countries_created": 1, "timings_ms": {"fetch": 1.0}}
+        with mock.patch("countryapi.jobs.run_refresh", return_value=result), \
+                mock.patch("countryapi.views.start_refresh_job", side_effect=execute_refresh_job):
+            response = self.client.post(reverse("country-refresh") + "?async=true")
+
+        self.assertEqual(response.status_code, 202)
+        status_response = self.client.get(response.data["status_url"])
+        self.assertEqual(status_response.status_code, 200)
+        self.assertEqual(status_response.data["status"], RefreshJob.STATUS_SUCCEEDED)
+        self.assertEqual(status_response.data["progress"], 100)
+        self.assertEqual(status_response.data["result"], result)
+
+    def test_identical_refreshes_write_nothing(self, _image):
+        with StubServer(COUNTRIES_PAYLOAD) as countries, StubServer({"rates": RATES_PAYLOAD}) as rates, \
+                mock.patch("countryapi.refresh.COUNTRY_URL", countries.url), \
+                mock.patch("countryapi.refresh.RATE_URL", rates.url):
+            first = self.client.post(reverse("country-refresh") + "?force=true")
+            gdp = dict(Country.objects.values_list("name", "estimated_gdp"))
+            second = self.client.post(reverse("country-refresh") + "?force=true")
+
+        self.assertEqual(first.data["countries_dirty"], 3)
+        self.assertFalse(second.data["not_modified"])
+        self.assertEqual(second.data["countries_dirty"], 0)
+        self.assertEqual(second.data["countries_unchanged"], 3)
+        self.assertEqual(dict(Country.objects.values_list("name", "estimated_gdp")), gdp)
+
+    def test_unchanged_upstream_short_circuits(self, _image):
+        with StubServer(COUNTRIES_PAYLOAD, etag='"c1"') as countries, StubServer({"rates": RATES_PAYLOAD}) as rates, \
+                mock.patch("countryapi.refresh.COUNTRY_URL", countries.url), \
+                mock.patch("countryapi.refresh.RATE_URL", rates.url):
+            first = self.client.post(reverse("country-refresh"))
+            second = self.client.post(reverse("country-refresh"))
+
+        self.assertEqual(first.data["countries_dirty"], 3)
+        # countries answered 304 and the rates body hashed the same as before
+        self.assertEqual(countries.hits, [None, '"c1"'])
+        self.assertTrue(second.data["not_modified"])
+        self.assertEqual(second.data["countries_dirty"], 0)
+
+
+
+@mock.patch("countryapi.refresh.generate_summary_image")
+class RateRefreshTests(APITestCase):
+    def refresh_rates(self, rates_payload):
+        # an unreachable country source proves the rate refresh never fetches countries
+        with StubServer({"rates": rates_payload}) as rates, \
+                mock.patch("countryapi.refresh.COUNTRY_URL", "http://127.0.0.1:9/countries"), \
+                mock.patch("countryapi.refresh.RATE_URL", rates.url), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("country-rates-refresh"))
+        self.assertEqual(response.status_code, 200)
+        return response.data, queries
+
+    def test_rates_rescale_gdp_in_place(self, _image):
+        with StubServer(COUNTRIES_PAYLOAD) as countries, StubServer({"rates": {"NGN": 1600.23}}) as rates, \
+                mock.patch("countryapi.refresh.COUNTRY_URL", countries.url), \
+                mock.patch("countryapi.refresh.RATE_URL", rates.url):
+            self.client.post(reverse("country-refresh"))
+        nigeria_gdp = Country.objects.get(name="Nigeria").estimated_gdp
+        self.assertIsNone(Country.objects.get(name="Ghana").estimated_gdp)
+        self.assertEqual(dict(ExchangeRate.objects.values_list("currency_code", "rate")), {"NGN": Decimal("1600.23")})
+
+        data, queries = self.refresh_rates({"NGN": 800.115, "GHS": 15.3, "USD": 1})
+        self.assertEqual((data["rates_updated"], data["rates_removed"], data["countries_updated"]), (3, 0, 2))
+        nigeria = Country.objects.get(name="Nigeria")
+        self.assertEqual(nigeria.exchange_rate, Decimal("800.115"))
+        self.assertAlmostEqual(nigeria.estimated_gdp, nigeria_gdp * 2, delta=2)
+        ghana = Country.objects.get(name="Ghana")
+        self.assertEqual(ghana.exchange_rate, Decimal("15.3"))
+        self.assertAlmostEqual(ghana.estimated_gdp, estimate_gdp(31072940, Decimal("15.3"), ghana.gdp_multiplier), delta=1)
+        # both countries are moved by a single set-based UPDATE
+        updates = [q["sql"] for q in queries.captured_queries if q["sql"].startswith('UPDATE "countryapi_country"')]
+        self.assertEqual(len(updates), 1)
+
+        data, _ = self.refresh_rates({"GHS": 15.3, "USD": 1})
+        self.assertEqual((data["rates_updated"], data["rates_removed"], data["countries_updated"]), (0, 1, 1))
+        nigeria.refresh_from_db()
+        self.assertIsNone(nigeria.exchange_rate)
+        self.assertIsNone(nigeria.estimated_gdp)
+        self.assertEqual(Country.objects.get(name="Ghana").estimated_gdp, ghana.estimated_gdp)
+
+        data, _ = self.refresh_rates({"GHS": 15.3, "USD": 1})
+        self.assertEqual((data["rates_updated"], data["rates_removed"], data["countries_updated"]), (0, 0, 0))
+
+    def test_full_refresh_reverts_rate_only_change(self, _image):
+        def full_refresh():
+            with StubServer(COUNTRIES_PAYLOAD) as countries, StubServer({"rates": {"NGN": 1600.23}}) as rates, \
+                    mock.patch("countryapi.refresh.COUNTRY_URL", countries.url), \
+                    mock.patch("countryapi.refresh.RATE_URL", rates.url):
+                return self.client.post(reverse("country-refresh")).data
+
+        full_refresh()
+        expected = Country.objects.get(name="Nigeria").estimated_gdp
+        self.refresh_rates({"NGN": 800})
+        self.assertEqual(Country.objects.get(name="Nigeria").exchange_rate, Decimal("800"))
+
+        data = full_refresh()
+        self.assertEqual(data["countries_updated"], 1)
+        nigeria = Country.objects.get(name="Nigeria")
+        self.assertEqual(nigeria.exchange_rate, Decimal("1600.23"))
+        self.assertEqual(nigeria.estimated_gdp, expected)
+
+    def test_failed_write_phase_rolls_back(self, _image):
+        with StubServer(COUNTRIES_PAYLOAD) as countries, StubServer({"rates": {"NGN": 1600.23}}) as rates, \
+                mock.patch("countryapi.refresh.COUNTRY_URL", countries.url), \
+                mock.patch("countryapi.refresh.RATE_URL", rates.url), \
+                mock.patch("countryapi.refresh.rebuild_country_stats", side_effect=RuntimeError("disk full")), \
+                self.assertLogs("countryapi.views", "CRITICAL"):
+            response = self.client.post(reverse("country-refresh"))
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Country.objects.exists())
+        self.assertFalse(ExchangeRate.objects.exists())
+        self.assertFalse(UpstreamSource.objects.filter(fetched_at__isnull=False).exists())
+
+@mock.patch("countryapi.refresh.generate_summary_image")
+class AsyncRefreshTests(TestCase):
+    async def post(self, query=""):
+        request = AsyncRequestFactory().post("/api/countries/refresh/" + query)
+        response = await views.AsyncRefreshCountryView.as_view()(request)
+        return response.status_code, json.loads(response.content)
+
+    async def test_async_view_refreshes_over_httpx(self, _image):
+        with StubServer(COUNTRIES_PAYLOAD, etag='"c1"') as countries, StubServer({"rates": RATES_PAYLOAD}) as rates, \
+                mock.patch("countryapi.refresh.COUNTRY_URL", countries.url), \
+                mock.patch("countryapi.refresh.RATE_URL", rates.url):
+            status_code, first = await self.post()
+            _, second = await self.post()
+
+        self.assertEqual(status_code, 200)
+        self.assertEqual(first["countries_created"], 3)
+        self.assertEqual(await Country.objects.acount(), 3)
+        self.assertEqual(countries.hits, [None, '"c1"'])
+        self.assertTrue(second["not_modified"])
+        job = await RefreshJob.objects.aget(id=first["job_id"])
+        self.assertEqual(job.status, RefreshJob.STATUS_SUCCEEDED)
+        self.assertIsNone(job.lock)
+
+    async def test_unreachable_upstream_is_503(self, _image):
+        with mock.patch("countryapi.refresh.COUNTRY_URL", "http://127.0.0.1:9/countries"), \
+                mock.patch("countryapi.refresh.RATE_URL", "http://127.0.0.1:9/rates"), \
+                override_settings(HTTP_RETRIES=0), \
+                self.assertLogs("countryapi.views", "ERROR"):
+            status_code, body = await self.post()
+        self.assertEqual(status_code, 503)
+        job = await RefreshJob.objects.aget(id__isnull=False)
+        self.assertEqual(job.status, RefreshJob.STATUS_FAILED)
+
+class CountryListCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        rows, _ = build_country_rows(COUNTRIES_PAYLOAD, RATES_PAYLOAD)
+        bulk_upsert_countries(rows, timezone.now())
+
+    def test_etag_and_not_modified(self):
+        url = reverse("country-list") + "?region=Africa&sort=name_asc"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([c["name"] for c in first.json()["results"]], ["Ghana", "Nigeria"])
+        etag = first["ETag"]
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached["ETag"], etag)
+
+    def test_cached_links_ignore_params_outside_cache_key(self):
+        url = reverse("country-list") + "?sort=name_asc&page_size=1"
+        first = self.client.get(url + "&utm_source=mail").json()
+        self.assertNotIn("utm_source", first["next"])
+        self.assertEqual(self.client.get(url).json()["next"], first["next"])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([c["name"] for c in second["results"]], ["Ghana"])
+
+    def test_delete_invalidates_cached_list(self):
+        url = reverse("country-list")
+        etag = self.client.get(url)["ETag"]
+        self.client.delete(reverse("country-detail", kwargs={"name": "ghana"}))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+
+class CountryIndexTests(TestCase):
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_list_filters_use_composite_indexes(self):
+        self.assertUsesIndex(Country.objects.filter(region="Africa").order_by("-estimated_gdp"), "country_region_gdp_idx")
+        self.assertUsesIndex(Country.objects.filter(region="Africa").order_by("population"), "country_region_pop_idx")
+        self.assertUsesIndex(Country.objects.filter(region="Africa").order_by("name"), "country_region_name_idx")
+        self.assertUsesIndex(Country.objects.filter(currency_code="NGN").order_by("-estimated_gdp"), "country_currency_gdp_idx")
+        self.assertUsesIndex(Country.objects.order_by("-population"), "country_population_idx")
+
+    def test_case_insensitive_lookup_uses_unique_index(self):
+        plan = Country.objects.filter(name_normalized=Country.normalize_name("NIGERIA")).explain()
+        self.assertIn("name_normalized", plan)
+
+
+class CountryPaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        payload = [
+            {"name": f"Country {i:02d}", "region": "Africa" if i % 2 else "Europe", "population": 1000 * (i % 4),
+             "currencies": [{"code": "NGN" if i % 3 else "XXX"}]}
+            for i in range(11)
+        ]
+        rows, _ = build_country_rows(payload, RATES_PAYLOAD)
+        bulk_upsert_countries(rows, timezone.now())
+
+    def walk(self, url, key):
+        """Follow ``key`` links from ``url``; returns the list of (url, names) pages visited."""
+        pages = []
+        while url:
+            body = self.client.get(url).json()
+            pages.append((url, [c["name"] for c in body["results"]]))
+            url = body[key]
+        return pages
+
+    def test_every_sort_order_walks_forward_and_back(self):
+        for sort, (field, descending) in views.GetCountriesView.SORT_ORDERS.items():
+            with self.subTest(sort=sort):
+                expected = list(Country.objects.order_by(
+                    F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_first=True),
+                    "-pk" if descending else "pk",
+                ).values_list("name", flat=True))
+
+                forward = self.walk(reverse("country-list") + f"?sort={sort}&page_size=3", "next")
+                self.assertEqual(sum((names for _, names in forward), []), expected)
+                self.assertEqual(len(forward), 4)
+
+                backward = self.walk(forward[-1][0], "previous")
+                self.assertEqual(sum((names for _, names in reversed(backward)), []), expected)
+
+    def test_unpaginated_opt_in_and_bad_cursor(self):
+        legacy = self.client.get(reverse("country-list") + "?paginate=false").json()
+        self.assertEqual(len(legacy), 11)
+        response = self.client.get(reverse("country-list") + "?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 400)
+
+    def test_tampered_cursors_are_rejected(self):
+        for position in ({"v": "x", "pk": 1}, {"v": 1, "pk": "abc"}, {"v": [1], "pk": 1}, {"v": 1, "pk": 1.5}):
+            with self.subTest(position=position):
+                cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+                response = self.client.get(reverse("country-list") + f"?sort=population_desc&cursor={cursor}")
+                self.assertEqual(response.status_code, 400)
+
+
+class CountryFastSerializerTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        rows, _ = build_country_rows(COUNTRIES_PAYLOAD, RATES_PAYLOAD)
+        bulk_upsert_countries(rows, timezone.now())
+        Country.objects.filter(name="Ghana").update(capital="Accra\u2028", exchange_rate=Decimal("0.0000000001"))
+
+    def test_rows_render_identically_to_model_serializer(self):
+        expected = JSONRenderer().render(CountrySerializer(Country.objects.order_by("pk"), many=True).data)
+        fast = countries_to_dicts(Country.objects.order_by("pk").values(*COUNTRY_COLUMNS))
+        self.assertEqual(JSONRenderer().render(fast), expected)
+        self.assertEqual(ORJSONRenderer().render(fast), expected)
+
+    def test_list_body_is_unchanged_with_orjson(self):
+        url = reverse("country-list") + "?paginate=false"
+        body = self.client.get(url).content
+        self.assertEqual(body, JSONRenderer().render(CountrySerializer(Country.objects.all(), many=True).data))
+        cache.clear()
+        with override_settings(USE_ORJSON=True):
+            self.assertEqual(self.client.get(url).content, body)
+
+
+class SummaryImageTests(APITestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings_override = override_settings(SUMMARY_IMAGE_DIR=self.tmp.name, SENDFILE_HEADER="")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        rows, _ = build_country_rows(COUNTRIES_PAYLOAD, RATES_PAYLOAD)
+        bulk_upsert_countries(rows, timezone.now())
+
+    def test_redraws_only_when_inputs_change(self):
+        self.assertTrue(summary_image.generate_summary_image())
+        self.assertFalse(summary_image.generate_summary_image())
+        self.assertEqual(set(os.listdir(self.tmp.name)), {summary_image.IMAGE_FILENAME, summary_image.FINGERPRINT_FILENAME})
+
+        Country.objects.filter(name="Ghana").update(estimated_gdp=10 ** 15)
+        self.assertFalse(summary_image.generate_summary_image())
+        rebuild_country_stats()
+        self.assertTrue(summary_image.generate_summary_image())
+        self.assertTrue(summary_image.generate_summary_image(force=True))
+        self.assertEqual(summary_image.load_fonts.cache_info().currsize, 1)
+
+    def test_conditional_get(self):
+        url = reverse("country-image")
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        summary_image.generate_summary_image()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"\x89PNG"))
+        response.close()
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], response["ETag"])
+        since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(since.status_code, 304)
+
+    def test_sendfile_header(self):
+        summary_image.generate_summary_image()
+        with override_settings(SENDFILE_HEADER="X-Accel-Redirect"):
+            response = self.client.get(reverse("country-image"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected/cache/summary.png")
+        self.assertEqual(response.content, b"")
+
+    def test_negotiated_formats_and_widths(self):
+        summary_image.generate_summary_image()
+        url = reverse("country-image")
+        png = self.client.get(url, HTTP_ACCEPT="*/*")
+        self.assertEqual(png["Content-Type"], "image/png")
+        self.assertIn("Accept", png["Vary"])
+        png_size = int(png["Content-Length"])
+        png.close()
+
+        webp = self.client.get(url + "?w=350", HTTP_ACCEPT="image/webp,image/*;q=0.8")
+        self.assertEqual(webp.status_code, 200)
+        self.assertEqual(webp["Content-Type"], "image/webp")
+        body = b"".join(webp.streaming_content)
+        webp.close()
+        self.assertLess(len(body), png_size)
+        with Image.open(io.BytesIO(body)) as image:
+            self.assertEqual(image.size, (400, 300))
+
+        variants = os.listdir(image_variants.variants_dir())
+        self.assertEqual(len(variants), 1)
+        again = self.client.get(url + "?w=400", HTTP_ACCEPT="image/webp", HTTP_IF_NONE_MATCH=webp["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(os.listdir(image_variants.variants_dir()), variants)
+
+        self.assertEqual(self.client.get(url + "?w=0").status_code, 400)
+        self.assertEqual(self.client.get(url + "?w=wide", HTTP_ACCEPT="image/webp").status_code, 400)
+
+    def test_variant_cache_is_bounded(self):
+        summary_image.generate_summary_image()
+        with override_settings(IMAGE_VARIANT_CACHE_BYTES=1):
+            first = image_variants.variant_path(200, "webp")
+            os.utime(first, ns=(0, os.stat(first).st_mtime_ns))
+            second = image_variants.variant_path(400, "webp")
+        self.assertEqual(os.listdir(image_variants.variants_dir()), [os.path.basename(second)])
+
+
+class CountryStatsTests(APITestCase):
+    def setUp(self):
+        rows, _ = build_country_rows(COUNTRIES_PAYLOAD, RATES_PAYLOAD)
+        Country.objects.bulk_create([
+            Country(name=name, name_normalized=name.lower(), **fields) for name, fields in rows.items()
+        ])
+        Country.objects.filter(name="Nigeria").update(estimated_gdp=300)
+        Country.objects.filter(name="Ghana").update(estimated_gdp=200)
+
+    def test_snapshot_serves_status_and_stats(self):
+        stats = rebuild_country_stats()
+        with self.assertNumQueries(1):
+            status = self.client.get(reverse("country-status")).json()
+        self.assertEqual(status, {
+            "total_countries": 3,
+            "last_refreshed_at": stats.last_refreshed_at.isoformat(),
+        })
+
+        with self.assertNumQueries(1):
+            body = self.client.get(reverse("country-stats")).json()
+        self.assertEqual(body["total_population"], 206139589 + 31072940 + 1000)
+        self.assertEqual(body["total_estimated_gdp"], 500)
+        self.assertEqual(body["regions"], [
+            {"region": "Africa", "countries": 2, "population": 206139589 + 31072940, "estimated_gdp": 500},
+            {"region": "Polar", "countries": 1, "population": 1000, "estimated_gdp": 0},
+        ])
+        self.assertEqual([row["name"] for row in body["top_by_gdp"]], ["Nigeria", "Ghana"])
+        self.assertEqual([row["name"] for row in body["top_by_population"]], ["Nigeria", "Ghana", "Antarctica"])
+
+    def test_delete_rebuilds_snapshot(self):
+        rebuild_country_stats()
+        self.client.delete(reverse("country-detail", args=["ghana"]))
+        body = self.client.get(reverse("country-stats")).json()
+        self.assertEqual(body["total_countries"], 2)
+        self.assertEqual([row["name"] for row in body["top_by_gdp"]], ["Nigeria"])
+
+    def test_missing_snapshot_is_built_on_read(self):
+        self.assertEqual(self.client.get(reverse("country-status")).json()["total_countries"], 3)
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_SLOW_REQUEST_MS=0)
+class MetricsTests(APITestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        rows, _ = build_country_rows(COUNTRIES_PAYLOAD, RATES_PAYLOAD)
+        Country.objects.bulk_create([
+            Country(name=name, name_normalized=name.lower(), **fields) for name, fields in rows.items()
+        ])
+        rebuild_country_stats()
+
+    def test_records_route_latency_queries_and_size(self):
+        response = self.client.get(reverse("country-status"))
+        self.assertEqual(response.status_code, 200)
+        self.client.get("/api/nowhere/")
+
+        series = metrics.registry.routes[("api/status/", "GET")]
+        self.assertEqual(series.statuses, {200: 1})
+        self.assertEqual(metrics.registry.routes[("unmatched", "GET")].statuses, {404: 1})
+        self.assertEqual(series.latency.count, 1)
+        self.assertEqual(series.response_size.sum, len(response.content))
+        self.assertEqual(series.db_queries, 1)
+
+        text = metrics.metrics_view(None).content.decode()
+        self.assertIn('catapi_http_requests_total{route="api/status/",method="GET",status="200"} 1', text)
+        self.assertIn('catapi_db_queries_total{route="api/status/",method="GET"} 1', text)
+        self.assertIn('catapi_http_request_duration_seconds_bucket{route="api/status/",method="GET",le="+Inf"} 1', text)
+
+    def test_outbound_time_is_attributed_to_host_and_route(self):
+        def get(view, request):
+            metrics.record_outbound("http://upstream.test/all", 0.25)
+            return Response({})
+
+        with mock.patch.object(views.GetCountryStatus, "get", get):
+            self.client.get(reverse("country-status"))
+        self.assertEqual(metrics.registry.outbound["upstream.test"].count, 1)
+        series = metrics.registry.routes[("api/status/", "GET")]
+        self.assertEqual((series.http_calls, series.http_seconds), (1, 0.25))
+
+    def test_slow_request_log_includes_sql(self):
+        with override_settings(METRICS_SLOW_REQUEST_MS=0.001), \
+                self.assertLogs("catapi.metrics", level="WARNING") as logs:
+            self.client.get(reverse("country-status"))
+        self.assertIn("api/status/", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+    def test_disabled_middleware_records_nothing(self):
+        with override_settings(METRICS_ENABLED=False):
+            self.client.get(reverse("country-status"))
+        self.assertEqual(metrics.registry.routes, {})
+
+
+class StructuredLoggingTests(SimpleTestCase):
+    class Collect(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.records = []
+            self.threads = set()
+
+        def emit(self, record):
+            self.records.append(self.format(record))
+            self.threads.add(threading.get_ident())
+
+    def record(self, msg, *args, level=logging.INFO, name="countryapi.refresh", **attrs):
+        record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+        record.__dict__.update(attrs)
+        return record
+
+    def test_json_formatter(self):
+        entry = json.loads(JSONFormatter().format(self.record("created %s", "Nigeria", job="abc")))
+        self.assertEqual(entry["message"], "created Nigeria")
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["logger"], "countryapi.refresh")
+        self.assertEqual(entry["job"], "abc")
+
+    def test_rate_limit_per_logger(self):
+        limiter = RateLimitFilter(rate=1, burst=2, rates={"api.views": 0})
+        with mock.patch("catapi.structured_logging.time.monotonic", return_value=100.0):
+            passed = [limiter.filter(self.record("row %d", i)) for i in range(5)]
+            self.assertEqual(passed, [True, True, False, False, False])
+            self.assertTrue(limiter.filter(self.record("boom", level=logging.ERROR)))
+            self.assertTrue(all(limiter.filter(self.record("x", name="api.views")) for _ in range(5)))
+        with mock.patch("catapi.structured_logging.time.monotonic", return_value=101.0):
+            record = self.record("row 5")
+            self.assertTrue(limiter.filter(record))
+            self.assertEqual(record.suppressed, 3)
+
+    def test_queue_handler_writes_on_listener_thread(self):
+        target = self.Collect()
+        target.setFormatter(JSONFormatter())
+        handler = QueueListenerHandler([target])
+        items = ["a"]
+        try:
+            handler.handle(self.record("items %s", items))
+            items.append("b")
+        finally:
+            handler.close()
+        self.assertEqual(json.loads(target.records[0])["message"], "items ['a']")
+        self.assertNotIn(threading.get_ident(), target.threads)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        entered, release = threading.Event(), threading.Event()
+
+        class Stuck(logging.Handler):
+            def emit(self, record):
+                entered.set()
+                release.wait(5)
+
+        handler = QueueListenerHandler([Stuck()], queue_size=1)
+        try:
+            handler.handle(self.record("taken by the listener"))
+            self.assertTrue(entered.wait(5))
+            handler.handle(self.record("queued"))
+            handler.handle(self.record("dropped"))
+            self.assertEqual(handler.dropped, 1)
+        finally:
+            release.set()
+            handler.close()
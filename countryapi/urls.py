@@ -1,12 +1,24 @@
+from django.conf import settings
 from django.urls import path
 from . import views 
 
+# ASYNC_VIEWS swaps in the native async variants of the outbound-I/O views (for ASGI servers)
+RefreshView = views.AsyncRefreshCountryView if settings.ASYNC_VIEWS else views.RefreshCountryView
+
 urlpatterns = [
     path('status/', views.GetCountryStatus.as_view(), name='country-status'),
-    path('countries/refresh/', views.RefreshCountryView.as_view(), name='country-refresh'),
-    path('countries/refresh', views.RefreshCountryView.as_view()),
+    path('countries/refresh/', RefreshView.as_view(), name='country-refresh'),
+    path('countries/refresh', RefreshView.as_view()),
+    path('countries/rates/refresh/', views.RefreshRatesView.as_view(), name='country-rates-refresh'),
+    path('countries/rates/refresh', views.RefreshRatesView.as_view()),
+    path('countries/refresh/<uuid:job_id>/', views.RefreshJobStatusView.as_view(), name='country-refresh-status'),
+    path('countries/refresh/<uuid:job_id>', views.RefreshJobStatusView.as_view()),
     path('countries/image/', views.GetImageSummery.as_view(), name='country-image'),
     path('countries/', views.GetCountriesView.as_view(), name='country-list'),
+    path('countries/export/', views.ExportCountriesView.as_view(), name='country-export'),
+    path('countries/export', views.ExportCountriesView.as_view()),
+    path('countries/stats/', views.CountryStatsView.as_view(), name='country-stats'),
+    path('countries/stats', views.CountryStatsView.as_view()),
     path('countries/<str:name>/', views.GetCountryView.as_view(), name='country-detail'),
     path('countries/<str:name>', views.GetCountryView.as_view()),
 ]
\ No newline at end of file